@@ -1,7 +1,7 @@
 """
 PDF auto-fill API endpoints.
 """
-from typing import Optional
+from typing import List, Optional
 from fastapi import APIRouter, UploadFile, File, Depends, HTTPException, status
 from fastapi.responses import FileResponse
 from sqlalchemy.orm import Session
@@ -11,6 +11,7 @@ from app.db.database import get_db
 from app.models import Document
 from app.schemas.autofill import AutoFillResult, AutoFillRequest
 from app.services.pdf_autofill import PDFAutoFillService
+from app.services.pdf_extractor import PDF_SNIFF_SIZE
 from app.services.pdf_form_detector import PDFFormDetector
 from app.storage.filesystem import storage
 
@@ -162,15 +163,18 @@ async def detect_form_fields(
     Returns:
         List of detected form fields
     """
-    pdf_content = await file.read()
+    # Parse the spooled upload in place rather than reading it into memory
+    upload = file.file
+    header = upload.read(PDF_SNIFF_SIZE)
+    upload.seek(0)
     
-    if not PDFFormDetector.is_pdf(pdf_content):
+    if not PDFFormDetector.is_pdf_prefix(header):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="File does not appear to be a valid PDF"
         )
     
-    fields = PDFFormDetector.detect_form_fields(pdf_content)
+    fields = PDFFormDetector.detect_form_fields(upload)
     
     return {
         "fields_detected": len(fields),
@@ -185,3 +189,50 @@ async def detect_form_fields(
         ]
     }
 
+
+@router.post("/detect-fields/batch")
+async def detect_form_fields_batch(
+    files: List[UploadFile] = File(...)
+):
+    """
+    Detect form fields in several PDFs at once (without filling).
+    
+    The PDFs are parsed in parallel worker processes; a single PDF is
+    parsed in place instead.
+    
+    Args:
+        files: PDF files to analyze
+        
+    Returns:
+        Detected form fields per file, in upload order
+    """
+    # Check every header before reading any upload in full
+    for file in files:
+        header = file.file.read(PDF_SNIFF_SIZE)
+        file.file.seek(0)
+        if not PDFFormDetector.is_pdf_prefix(header):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"File '{file.filename}' does not appear to be a valid PDF"
+            )
+    
+    results = await PDFFormDetector.detect_form_fields_batch_async([file.file for file in files])
+    
+    return {
+        "documents": [
+            {
+                "filename": file.filename,
+                "fields_detected": len(fields),
+                "fields": [
+                    {
+                        "name": field.field_name,
+                        "type": field.field_type,
+                        "value": field.value,
+                        "page": field.page_number
+                    }
+                    for field in fields
+                ]
+            }
+            for file, fields in zip(files, results)
+        ]
+    }
@@ -1,6 +1,7 @@
 """
 Document upload and management API endpoints.
 """
+import os
 import uuid
 from pathlib import Path
 from typing import Optional
@@ -12,8 +13,9 @@ from app.db.database import get_db
 from app.models.document import Document
 from app.schemas.document import DocumentResponse, DocumentUploadResponse, DocumentListResponse
 from app.storage.filesystem import storage
-from app.services.pdf_extractor import PDFExtractor
+from app.services.pdf_extractor import PDFExtractor, PDF_SNIFF_SIZE
 from app.services.events import publish_document_ingested
+from app.services.pdf_autofill import invalidate_autofill_cache
 from app.core.config import settings
 
 logger = logging.getLogger(__name__)
@@ -104,9 +106,11 @@ async def upload_document(
         # Validate file
         validate_file(file)
         
-        # Read file content
-        file_content = await file.read()
-        file_size = len(file_content)
+        # Measure the spooled upload without reading it into memory
+        upload = file.file
+        upload.seek(0, os.SEEK_END)
+        file_size = upload.tell()
+        upload.seek(0)
         
         # Check file size
         if file_size > settings.MAX_FILE_SIZE:
@@ -121,8 +125,10 @@ async def upload_document(
                 detail="File is empty"
             )
         
-        # Validate PDF format
-        if not PDFExtractor.is_pdf(file_content):
+        # Validate PDF format from the header only
+        header = upload.read(PDF_SNIFF_SIZE)
+        upload.seek(0)
+        if not PDFExtractor.is_pdf_prefix(header):
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="File does not appear to be a valid PDF"
@@ -131,9 +137,9 @@ async def upload_document(
         # Generate storage path
         storage_path = generate_file_path(file.filename)
         
-        # Store file
+        # Store file (streamed from the upload in chunks, off the event loop)
         try:
-            full_path = storage.save(file_content, storage_path)
+            full_path = await storage.save_async(upload, storage_path)
         except Exception as e:
             logger.error(f"Error saving file {file.filename}: {e}")
             raise HTTPException(
@@ -145,7 +151,9 @@ async def upload_document(
         text_extracted = False
         extracted_text = None
         try:
-            extracted_text = PDFExtractor.extract_text(file_content, file.filename)
+            # Hand the extractor the spooled upload rather than a bytes copy
+            upload.seek(0)
+            extracted_text = PDFExtractor.extract_text(upload, file.filename)
             text_extracted = extracted_text is not None
             
         except Exception as e:
@@ -205,10 +213,11 @@ async def upload_document(
         if text_extracted and extracted_text:
             try:
                 from app.services.field_extractor import FieldExtractor
+                upload.seek(0)
                 extracted_fields = FieldExtractor.extract_fields_from_document(
                     document_id=document.id,
                     db=db,
-                    file_content=file_content
+                    file_content=upload
                 )
                 fields_extracted = len(extracted_fields)
                 logger.info(f"Extracted {fields_extracted} fields from document {document.id}")
@@ -322,4 +331,7 @@ async def delete_document(
     db.delete(document)
     db.commit()
     
+    # Cached auto-fill explanations may name this document as a value's source
+    invalidate_autofill_cache()
+    
     return None
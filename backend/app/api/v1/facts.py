@@ -19,6 +19,7 @@ from app.schemas.facts import (
 )
 from app.services.prompts import get_field_definitions
 from app.services.memory_graph import MemoryGraphService
+from app.services.pdf_autofill import invalidate_autofill_cache
 
 logger = logging.getLogger(__name__)
 
@@ -219,6 +220,7 @@ async def create_fact(
         )
         
         db.commit()
+        invalidate_autofill_cache()
         db.refresh(new_fact)
         
         return FactResponse.model_validate(new_fact)
@@ -1,16 +1,59 @@
 """
 Database connection and session management.
 """
+from typing import Any, Dict
+
 from sqlalchemy import create_engine
+from sqlalchemy.engine import URL, make_url
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
 from app.core.config import settings
 
+
+def _is_sqlite_memory(url: URL) -> bool:
+    """
+    Check whether a database URL points at an in-memory SQLite database.
+    
+    Args:
+        url: Parsed database URL
+        
+    Returns:
+        True for ``sqlite://``, ``sqlite:///:memory:`` and ``file::memory:`` URIs
+    """
+    if url.get_backend_name() != "sqlite":
+        return False
+    database = url.database or ""
+    return database in ("", ":memory:") or database.startswith("file::memory:") or url.query.get("mode") == "memory"
+
+
+def _engine_options(database_url: str) -> Dict[str, Any]:
+    """
+    Extra create_engine options for the configured database.
+    
+    An in-memory SQLite database lives only as long as its connection, so
+    every session has to share a single connection across threads.
+    
+    Args:
+        database_url: Database connection string
+        
+    Returns:
+        Keyword arguments for create_engine
+    """
+    if _is_sqlite_memory(make_url(database_url)):
+        return {
+            "connect_args": {"check_same_thread": False},
+            "poolclass": StaticPool,
+        }
+    return {}
+
+
 # Create database engine
 engine = create_engine(
     settings.DATABASE_URL,
     pool_pre_ping=True,  # Verify connections before using
-    echo=False  # Set to True for SQL query logging
+    echo=False,  # Set to True for SQL query logging
+    **_engine_options(settings.DATABASE_URL)
 )
 
 # Create session factory
@@ -4,7 +4,7 @@ Field extraction service that orchestrates the extraction pipeline.
 This service coordinates text extraction, LLM field extraction, and database storage.
 """
 import logging
-from typing import Optional
+from typing import BinaryIO, Optional, Union
 from sqlalchemy.orm import Session
 
 from app.models import Document, ExtractedField
@@ -29,14 +29,15 @@ class FieldExtractor:
     def extract_fields_from_document(
         document_id: int,
         db: Session,
-        file_content: Optional[bytes] = None
+        file_content: Optional[Union[bytes, BinaryIO]] = None
     ) -> list[ExtractedField]:
         """
         Extract fields from a document.
         
         Args:
             document_id: ID of the document in database
-            file_content: Optional file content (if not provided, will read from storage)
+            file_content: Optional file content or seekable binary file object
+                positioned at its start (if not provided, will read from storage)
             db: Database session
             
         Returns:
@@ -104,11 +105,11 @@ class FieldExtractor:
                 logger.error(f"Error saving extracted field {field_output.field_name}: {e}")
                 continue
         
-        # Commit all fields
+        # Commit all fields (the insert already populated their IDs; the
+        # status commit below expires them again, so refreshing here would
+        # only cost a SELECT per field)
         if created_fields:
             db.commit()
-            for field in created_fields:
-                db.refresh(field)
             
             # Step 4: Process extracted fields into Company Memory Graph
             try:
@@ -6,15 +6,33 @@ Currently implemented with a stubbed LLM call for development.
 """
 import json
 import logging
-from typing import Optional
+import re
+from typing import Dict, List, Optional
 from pydantic import ValidationError
 
 from app.schemas.extraction import ExtractionResult, ExtractedFieldOutput
-from app.services.prompts import build_extraction_prompt
+from app.services.prompts import build_extraction_prompt, get_field_definitions
 
 logger = logging.getLogger(__name__)
 
 
+# Fields with a fixed textual shape can be matched directly when the LLM
+# doesn't return them. All patterns share one compiled alternation, so the
+# document is scanned once; the group name is the field name.
+_DETERMINISTIC_PATTERNS = {
+    "ein": r"(?<![\d-])\d{2}-\d{7}(?![\d-])",
+    "phone": r"(?<![\d-])(?:\+1[-.\s]?)?(?:\(\d{3}\)\s?|\d{3}[-.\s])\d{3}[-.\s]\d{4}(?![\d-])",
+    "email": r"[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Za-z]{2,}",
+    "website": r"(?:https?://|www\.)[A-Za-z0-9.-]+\.[A-Za-z]{2,}(?:/[^\s]*)?",
+}
+_DETERMINISTIC_REGEX = re.compile(
+    "|".join(f"(?P<{name}>{pattern})" for name, pattern in _DETERMINISTIC_PATTERNS.items())
+)
+# The first pattern match may be a fax or a third party's number, so pattern
+# hits rank below model answers and can be overridden in the Memory Graph
+DETERMINISTIC_CONFIDENCE = 0.5
+
+
 class LLMExtractor:
     """
     Service for extracting structured fields from document text using LLM.
@@ -30,12 +48,18 @@ class LLMExtractor:
     """
     
     @staticmethod
-    def extract_fields(document_text: str) -> ExtractionResult:
+    def extract_fields(document_text: str, fields: Optional[List[str]] = None) -> ExtractionResult:
         """
         Extract structured fields from document text using LLM.
         
+        All fields are requested in one prompt and parsed from one JSON
+        response, so extraction costs one LLM round trip. Fixed-format fields
+        (EIN, phone, email, website) the LLM doesn't return fall back to a
+        regex match, at a lower confidence.
+        
         Args:
             document_text: The parsed text from the document
+            fields: Names of the fields to extract (defaults to all fields)
             
         Returns:
             ExtractionResult with extracted fields
@@ -56,8 +80,10 @@ class LLMExtractor:
         
         logger.info(f"Extracting fields from document text ({len(document_text)} characters)")
         
-        # Build prompt
-        prompt = build_extraction_prompt(document_text)
+        requested = fields if fields is not None else [field["name"] for field in get_field_definitions()]
+        
+        # Build prompt (raises ValueError for unknown field names)
+        prompt = build_extraction_prompt(document_text, requested)
         
         # TODO: Replace with actual LLM API call
         # For now, use stubbed response
@@ -67,6 +93,22 @@ class LLMExtractor:
             # Parse and validate response
             result = LLMExtractor._parse_and_validate_response(llm_response)
             
+            # Drop anything the model returned that wasn't asked for
+            wanted = set(requested)
+            result.fields = [field for field in result.fields if field.field_name in wanted]
+            
+            # Fill fixed-format fields the model didn't return from one regex pass
+            returned = {field.field_name for field in result.fields}
+            missing = {name for name in requested if name in _DETERMINISTIC_PATTERNS and name not in returned}
+            if missing:
+                fallback = [
+                    field for field in LLMExtractor._deterministic_extract(document_text).fields
+                    if field.field_name in missing
+                ]
+                if fallback:
+                    result.fields += fallback
+                    result.extraction_method = f"{result.extraction_method}+regex"
+            
             logger.info(f"Successfully extracted {len(result.fields)} fields")
             return result
             
@@ -74,6 +116,62 @@ class LLMExtractor:
             logger.error(f"Error during field extraction: {e}")
             raise ValueError(f"Field extraction failed: {e}")
     
+    @staticmethod
+    def extract_all(fields: List[str], document_text: str) -> Dict[str, ExtractedFieldOutput]:
+        """
+        Extract a set of fields from document text in one LLM call.
+        
+        Args:
+            fields: Names of the fields to extract
+            document_text: The parsed text from the document
+            
+        Returns:
+            Dictionary of field name -> extracted field, for the requested
+            fields that were found (the most confident value wins if a field
+            is returned more than once)
+            
+        Raises:
+            ValueError: If extraction fails or a field name is unknown
+        """
+        result = LLMExtractor.extract_fields(document_text, fields)
+        
+        extracted: Dict[str, ExtractedFieldOutput] = {}
+        for field in result.fields:
+            current = extracted.get(field.field_name)
+            if current is None or field.confidence > current.confidence:
+                extracted[field.field_name] = field
+        return extracted
+    
+    @staticmethod
+    def _deterministic_extract(document_text: str) -> ExtractionResult:
+        """
+        Extract fixed-format fields (EIN, phone, email, website) with regexes.
+        
+        Used as a fallback for fields the LLM doesn't return.
+        
+        Args:
+            document_text: The document text
+            
+        Returns:
+            ExtractionResult with the first match for each field found
+        """
+        fields = {}
+        for match in _DETERMINISTIC_REGEX.finditer(document_text):
+            field_name = match.lastgroup
+            if field_name in fields:
+                continue
+            fields[field_name] = ExtractedFieldOutput(
+                field_name=field_name,
+                value=match.group(),
+                confidence=DETERMINISTIC_CONFIDENCE,
+                source_span={"start": match.start(), "end": match.end(), "text": match.group()},
+                field_type="text",
+                notes="Matched by pattern"
+            )
+            if len(fields) == len(_DETERMINISTIC_PATTERNS):
+                break
+        return ExtractionResult(fields=list(fields.values()), extraction_method="regex")
+    
     @staticmethod
     def _stub_llm_call(document_text: str, prompt: str) -> str:
         """
@@ -9,9 +9,12 @@ This service manages the canonical company facts (memory graph) by:
 - Handling user edits
 """
 import logging
-from typing import Optional, List, Tuple
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional, List, Tuple
 from sqlalchemy.orm import Session
 from sqlalchemy import and_
+from sqlalchemy.exc import IntegrityError, PendingRollbackError
+from sqlalchemy.pool import StaticPool
 
 from app.models import ExtractedField, CompanyFact
 from app.models.fact_history import FactHistory, ChangeType
@@ -19,6 +22,13 @@ from app.models.fact_history import FactHistory, ChangeType
 logger = logging.getLogger(__name__)
 
 
+# Session.info key for the per-session fact_key -> fact ID cache used by get_fact
+_FACT_IDS_INFO_KEY = "memory_graph_fact_ids"
+
+# Reason given when an extraction is not applied because the fact was user-edited
+USER_EDIT_LOCK_REASON = "Fact has been user-edited, preserving user value"
+
+
 class ConflictResolutionStrategy:
     """
     Conflict resolution strategies for handling conflicting values.
@@ -53,7 +63,7 @@ class ConflictResolutionStrategy:
         """
         # Rule 1: User edits always win - never overwrite user-edited facts
         if existing_fact.edit_count > 0:
-            return False, "Fact has been user-edited, preserving user value"
+            return False, USER_EDIT_LOCK_REASON
         
         # Rule 2: If values are identical (normalized), no update needed
         if _normalize_value(existing_fact.fact_value) == _normalize_value(new_value):
@@ -90,6 +100,26 @@ def _normalize_value(value: str) -> str:
     return value.lower().strip()
 
 
+def _select_best_extractions(extracted_fields: List[Any]) -> Dict[str, Any]:
+    """
+    Pick the highest-confidence extraction for each field name in one pass.
+    
+    Args:
+        extracted_fields: Extracted field records or rows with field_name and
+            confidence attributes, in query order
+        
+    Returns:
+        Dictionary of field name -> best extraction (the first one wins ties),
+        in order of each field name's first appearance
+    """
+    best: Dict[str, Any] = {}
+    for field in extracted_fields:
+        current = best.get(field.field_name)
+        if current is None or field.confidence > current.confidence:
+            best[field.field_name] = field
+    return best
+
+
 def _get_fact_category(field_name: str) -> str:
     """
     Determine fact category from field name.
@@ -115,6 +145,13 @@ def _get_fact_category(field_name: str) -> str:
         return 'company_info'
 
 
+
+def _invalidate_autofill_cache() -> None:
+    """Drop cached auto-fill results, which embed fact values; call after commit."""
+    # Imported here because pdf_autofill imports this module
+    from app.services.pdf_autofill import invalidate_autofill_cache
+    invalidate_autofill_cache()
+
 class MemoryGraphService:
     """
     Service for managing the Company Memory Graph.
@@ -123,6 +160,8 @@ class MemoryGraphService:
     with conflict resolution and history tracking.
     """
     
+    MAX_PARALLEL_DOCUMENTS = 5  # Upper bound on worker threads in process_many
+    
     @staticmethod
     def process_extracted_fields(
         document_id: int,
@@ -140,29 +179,47 @@ class MemoryGraphService:
         """
         logger.info(f"Processing extracted fields for document {document_id}")
         
-        # Get all extracted fields for this document
-        extracted_fields = db.query(ExtractedField).filter(
+        # Only the columns needed to pick winners are loaded for every field
+        candidates = db.query(
+            ExtractedField.id,
+            ExtractedField.field_name,
+            ExtractedField.confidence
+        ).filter(
             ExtractedField.document_id == document_id
-        ).all()
+        ).order_by(ExtractedField.id).all()
         
-        if not extracted_fields:
+        if not candidates:
             logger.info(f"No extracted fields found for document {document_id}")
             return []
         
         processed_facts = []
         
-        # Group by field_name to handle multiple extractions of same field
-        field_groups = {}
-        for field in extracted_fields:
-            if field.field_name not in field_groups:
-                field_groups[field.field_name] = []
-            field_groups[field.field_name].append(field)
+        # For each field name, pick the best extraction (highest confidence),
+        # then load full records for the winners only
+        best_rows = _select_best_extractions(candidates)
+        winners = db.query(ExtractedField).filter(
+            ExtractedField.id.in_([row.id for row in best_rows.values()])
+        ).all()
+        winners_by_id = {field.id: field for field in winners}
+        best_fields = {name: winners_by_id[row.id] for name, row in best_rows.items()}
+        
+        # If every field maps to a user-edited fact, nothing can be applied:
+        # record the attempts and skip conflict resolution altogether
+        locked_facts = MemoryGraphService._get_locked_facts(list(best_fields), db)
+        if len(locked_facts) == len(best_fields):
+            for field_name, best_field in best_fields.items():
+                MemoryGraphService._record_skipped_extraction(
+                    fact=locked_facts[field_name],
+                    extracted_field=best_field,
+                    reason=USER_EDIT_LOCK_REASON,
+                    db=db
+                )
+            db.commit()
+            logger.info(f"All fields for document {document_id} map to user-edited facts, skipped processing")
+            return []
         
         # Process each field
-        for field_name, fields in field_groups.items():
-            # For each field, pick the best extraction (highest confidence)
-            best_field = max(fields, key=lambda f: f.confidence)
-            
+        for field_name, best_field in best_fields.items():
             try:
                 fact = MemoryGraphService._process_single_field(
                     field_name=field_name,
@@ -176,10 +233,82 @@ class MemoryGraphService:
                 continue
         
         db.commit()
+        _invalidate_autofill_cache()
         logger.info(f"Processed {len(processed_facts)} facts for document {document_id}")
         
         return processed_facts
     
+    @staticmethod
+    def process_many(
+        document_ids: List[int],
+        db_factory: Callable[[], Session]
+    ) -> Dict[int, List[int]]:
+        """
+        Process extracted fields for several documents concurrently.
+        
+        Each document is processed in its own session from db_factory and
+        committed independently. A single document is processed inline, as
+        are all documents when every session shares one connection (in-memory
+        SQLite), since that connection cannot hold separate transactions.
+        
+        Args:
+            document_ids: IDs of the documents to process
+            db_factory: Callable returning a new database session (e.g. SessionLocal)
+            
+        Returns:
+            Mapping of document ID to IDs of the created/updated facts
+        """
+        if len(document_ids) <= 1 or MemoryGraphService._shares_one_connection(db_factory):
+            return {
+                document_id: MemoryGraphService._process_in_session(document_id, db_factory)
+                for document_id in document_ids
+            }
+        
+        max_workers = min(len(document_ids), MemoryGraphService.MAX_PARALLEL_DOCUMENTS)
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            results = pool.map(
+                lambda document_id: MemoryGraphService._process_in_session(document_id, db_factory),
+                document_ids
+            )
+            return dict(zip(document_ids, results))
+    
+    @staticmethod
+    def _shares_one_connection(db_factory: Callable[[], Session]) -> bool:
+        """Check whether sessions from db_factory all use the same connection."""
+        db = db_factory()
+        try:
+            return isinstance(db.get_bind().pool, StaticPool)
+        finally:
+            db.close()
+    
+    @staticmethod
+    def _process_in_session(
+        document_id: int,
+        db_factory: Callable[[], Session]
+    ) -> List[int]:
+        """
+        Process one document's extracted fields in a session of its own.
+        
+        Args:
+            document_id: ID of the document
+            db_factory: Callable returning a new database session
+            
+        Returns:
+            IDs of the created/updated facts
+        """
+        db = db_factory()
+        try:
+            try:
+                facts = MemoryGraphService.process_extracted_fields(document_id, db)
+            except (IntegrityError, PendingRollbackError):
+                # Another document created the same fact first; run again so the
+                # new value goes through conflict resolution against it
+                db.rollback()
+                facts = MemoryGraphService.process_extracted_fields(document_id, db)
+            return [fact.id for fact in facts]
+        finally:
+            db.close()
+    
     @staticmethod
     def _process_single_field(
         field_name: str,
@@ -242,16 +371,10 @@ class MemoryGraphService:
             else:
                 logger.info(f"Skipped update for {field_name}: {reason}")
                 # Still create history entry for the attempt
-                MemoryGraphService._create_history_entry(
+                MemoryGraphService._record_skipped_extraction(
                     fact=existing_fact,
-                    change_type=ChangeType.EXTRACTION,
-                    old_value=existing_fact.fact_value,
-                    new_value=extracted_field.value,
-                    old_confidence=str(existing_fact.confidence),
-                    new_confidence=str(extracted_field.confidence),
-                    changed_by="system",
-                    reason=f"Extraction attempted but not applied: {reason}",
-                    source_document_id=extracted_field.document_id,
+                    extracted_field=extracted_field,
+                    reason=reason,
                     db=db
                 )
                 return None
@@ -288,6 +411,57 @@ class MemoryGraphService:
             logger.info(f"Created new fact {field_name}: {extracted_field.value}")
             return new_fact
     
+    @staticmethod
+    def _get_locked_facts(fact_keys: List[str], db: Session) -> Dict[str, CompanyFact]:
+        """
+        Get the active, user-edited facts among the given keys in one query.
+        
+        Args:
+            fact_keys: Fact keys to look up
+            db: Database session
+            
+        Returns:
+            Dictionary of fact key -> user-edited CompanyFact
+        """
+        facts = db.query(CompanyFact).filter(
+            CompanyFact.fact_key.in_(fact_keys),
+            CompanyFact.status == "active",
+            CompanyFact.edit_count > 0
+        ).all()
+        return {fact.fact_key: fact for fact in facts}
+    
+    @staticmethod
+    def _record_skipped_extraction(
+        fact: CompanyFact,
+        extracted_field: ExtractedField,
+        reason: str,
+        db: Session
+    ) -> FactHistory:
+        """
+        Record an extraction that was not applied to a fact.
+        
+        Args:
+            fact: The CompanyFact that was kept
+            extracted_field: The extraction that was not applied
+            reason: Why the extraction was not applied
+            db: Database session
+            
+        Returns:
+            Created FactHistory record
+        """
+        return MemoryGraphService._create_history_entry(
+            fact=fact,
+            change_type=ChangeType.EXTRACTION,
+            old_value=fact.fact_value,
+            new_value=extracted_field.value,
+            old_confidence=str(fact.confidence),
+            new_confidence=str(extracted_field.confidence),
+            changed_by="system",
+            reason=f"Extraction attempted but not applied: {reason}",
+            source_document_id=extracted_field.document_id,
+            db=db
+        )
+    
     @staticmethod
     def _create_history_entry(
         fact: CompanyFact,
@@ -397,6 +571,7 @@ class MemoryGraphService:
         )
         
         db.commit()
+        _invalidate_autofill_cache()
         logger.info(f"User {user_id} edited fact {fact_key}: {old_value} -> {new_value}")
         
         return fact
@@ -406,6 +581,10 @@ class MemoryGraphService:
         """
         Get a canonical fact by key.
         
+        The fact's ID is remembered on the session, so repeat lookups are
+        served from the session's identity map by primary key. A cached
+        fact that was re-keyed, deactivated or deleted falls back to a query.
+        
         Args:
             fact_key: Key of the fact
             db: Database session
@@ -413,10 +592,22 @@ class MemoryGraphService:
         Returns:
             CompanyFact or None if not found
         """
-        return db.query(CompanyFact).filter(
+        fact_ids = db.info.setdefault(_FACT_IDS_INFO_KEY, {})
+        fact_id = fact_ids.get(fact_key)
+        if fact_id is not None:
+            fact = db.get(CompanyFact, fact_id)
+            if fact is not None and fact.fact_key == fact_key and fact.status == "active":
+                return fact
+        
+        fact = db.query(CompanyFact).filter(
             CompanyFact.fact_key == fact_key,
             CompanyFact.status == "active"
         ).first()
+        if fact is not None:
+            fact_ids[fact_key] = fact.id
+        else:
+            fact_ids.pop(fact_key, None)
+        return fact
     
     @staticmethod
     def get_all_facts(db: Session, category: Optional[str] = None) -> List[CompanyFact]:
@@ -452,4 +643,25 @@ class MemoryGraphService:
         return db.query(FactHistory).filter(
             FactHistory.fact_id == fact_id
         ).order_by(FactHistory.changed_at.desc()).all()
+    
+    @staticmethod
+    def get_fact_histories(fact_ids: List[int], db: Session) -> Dict[int, List[FactHistory]]:
+        """
+        Get history for several facts in one query.
+        
+        Args:
+            fact_ids: IDs of the facts
+            db: Database session
+            
+        Returns:
+            Dictionary of fact ID -> FactHistory records (newest first); facts
+            without history map to an empty list
+        """
+        histories: Dict[int, List[FactHistory]] = {fact_id: [] for fact_id in fact_ids}
+        entries = db.query(FactHistory).filter(
+            FactHistory.fact_id.in_(fact_ids)
+        ).order_by(FactHistory.fact_id, FactHistory.changed_at.desc()).all()
+        for entry in entries:
+            histories[entry.fact_id].append(entry)
+        return histories
 
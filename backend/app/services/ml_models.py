@@ -7,30 +7,61 @@ This module provides ML-powered enhancements to replace heuristic/stub implement
 3. Named entity recognition for company information
 4. Form field detection and classification
 """
+import importlib
+import importlib.util
 import logging
 from typing import List, Dict, Optional, Any
-import torch
-import torch.nn as nn
-from transformers import AutoTokenizer, AutoModelForSequenceClassification, AutoModelForTokenClassification
 
 logger = logging.getLogger(__name__)
 
+# PyTorch and transformers take seconds to import, so only check that they are
+# installed here; they are imported when a model is first initialized.
+
 # Check if PyTorch is available
-try:
-    import torch
-    PYTORCH_AVAILABLE = True
-except ImportError:
-    PYTORCH_AVAILABLE = False
+PYTORCH_AVAILABLE = importlib.util.find_spec("torch") is not None
+if not PYTORCH_AVAILABLE:
     logger.warning("PyTorch not available - ML models will be stubbed")
 
 # Check if transformers is available
-try:
-    from transformers import pipeline, AutoTokenizer, AutoModelForSequenceClassification
-    TRANSFORMERS_AVAILABLE = True
-except ImportError:
-    TRANSFORMERS_AVAILABLE = False
+TRANSFORMERS_AVAILABLE = importlib.util.find_spec("transformers") is not None
+if not TRANSFORMERS_AVAILABLE:
     logger.warning("Transformers library not available - ML models will be stubbed")
 
+# Attributes this module used to import eagerly, resolved on first access
+_LAZY_IMPORTS = {
+    "torch": ("torch", None),
+    "nn": ("torch.nn", None),
+    "pipeline": ("transformers", "pipeline"),
+    "AutoTokenizer": ("transformers", "AutoTokenizer"),
+    "AutoModelForSequenceClassification": ("transformers", "AutoModelForSequenceClassification"),
+    "AutoModelForTokenClassification": ("transformers", "AutoModelForTokenClassification"),
+}
+
+
+def __getattr__(name: str) -> Any:
+    """Import heavy ML dependencies on first attribute access (PEP 562)."""
+    if name not in _LAZY_IMPORTS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    
+    module_name, attr_name = _LAZY_IMPORTS[name]
+    module = importlib.import_module(module_name)
+    value = module if attr_name is None else getattr(module, attr_name)
+    globals()[name] = value
+    return value
+
+# Keyword tuples used by the label/field classification heuristics below.
+# Built once at import; matching is by substring so e.g. "previous_employer"
+# still hits "previous".
+_EMPLOYMENT_KEYWORDS = ("employment", "job", "application")
+_TAX_KEYWORDS = ("tax", "irs")
+_TAX_LABEL_KEYWORDS = _TAX_KEYWORDS + ("w-2",)
+_CONTRACT_KEYWORDS = ("contract", "agreement")
+_LICENSE_KEYWORDS = ("license", "permit")
+_PREVIOUS_KEYWORDS = ("previous", "prior", "former", "past", "old")
+_CURRENT_KEYWORDS = ("current", "present", "now")
+_COMPANY_KEYWORDS = ("company", "employer", "business")
+_PERSONAL_KEYWORDS = ("name", "address", "phone", "email")
+
 
 class DocumentTypeClassifier:
     """
@@ -52,6 +83,8 @@ class DocumentTypeClassifier:
             return
         
         try:
+            from transformers import AutoTokenizer, pipeline
+            
             # Use a lightweight model for document classification
             # In production, fine-tune on your document dataset
             model_name = "distilbert-base-uncased"  # Lightweight, fast
@@ -115,13 +148,13 @@ class DocumentTypeClassifier:
         """Map model labels to our document types."""
         label_lower = label.lower()
         
-        if any(word in label_lower for word in ["employment", "job", "application"]):
+        if any(word in label_lower for word in _EMPLOYMENT_KEYWORDS):
             return "employment_application"
-        elif any(word in label_lower for word in ["tax", "irs", "w-2"]):
+        elif any(word in label_lower for word in _TAX_LABEL_KEYWORDS):
             return "tax_form"
-        elif any(word in label_lower for word in ["contract", "agreement"]):
+        elif any(word in label_lower for word in _CONTRACT_KEYWORDS):
             return "contract"
-        elif any(word in label_lower for word in ["license", "permit"]):
+        elif any(word in label_lower for word in _LICENSE_KEYWORDS):
             return "license_application"
         else:
             return "general_form"
@@ -130,9 +163,9 @@ class DocumentTypeClassifier:
         """Fallback heuristic classification."""
         combined = f"{' '.join(field_names)} {text[:500]}".lower()
         
-        if any(word in combined for word in ["employment", "job", "application"]):
+        if any(word in combined for word in _EMPLOYMENT_KEYWORDS):
             return {"document_type": "employment_application", "confidence": 0.7, "reasoning": "Heuristic classification"}
-        elif any(word in combined for word in ["tax", "irs"]):
+        elif any(word in combined for word in _TAX_KEYWORDS):
             return {"document_type": "tax_form", "confidence": 0.7, "reasoning": "Heuristic classification"}
         else:
             return {"document_type": "general_form", "confidence": 0.5, "reasoning": "Heuristic classification"}
@@ -159,6 +192,8 @@ class FieldContextAnalyzer:
             return
         
         try:
+            from transformers import pipeline
+            
             # Use a pre-trained NER model
             self.ner_pipeline = pipeline(
                 "ner",
@@ -224,11 +259,11 @@ class FieldContextAnalyzer:
         field_lower = field_name.lower()
         
         # Check for temporal indicators
-        if any(word in field_lower for word in ["previous", "prior", "former", "past", "old"]):
+        if any(word in field_lower for word in _PREVIOUS_KEYWORDS):
             return "company_previous"
         
         # Check for current indicators
-        if any(word in field_lower for word in ["current", "present", "now"]):
+        if any(word in field_lower for word in _CURRENT_KEYWORDS):
             return "company_current"
         
         # Check entity types from NER
@@ -238,7 +273,7 @@ class FieldContextAnalyzer:
                 return "company_previous"
         
         # Default categorization
-        if any(word in field_lower for word in ["company", "employer", "business"]):
+        if any(word in field_lower for word in _COMPANY_KEYWORDS):
             # Check document context - if there are "previous" fields, this might be current
             if all_fields:
                 has_previous = any("previous" in f.lower() for f in all_fields)
@@ -246,7 +281,7 @@ class FieldContextAnalyzer:
                     return "company_current"  # Likely current if there are previous fields
             return "company_current"  # Default to current
         
-        if any(word in field_lower for word in ["name", "address", "phone", "email"]):
+        if any(word in field_lower for word in _PERSONAL_KEYWORDS):
             return "personal"
         
         return "other"
@@ -286,6 +321,8 @@ class CompanyInfoExtractor:
             return
         
         try:
+            from transformers import pipeline
+            
             # Use a model fine-tuned for business/company entities
             self.ner_pipeline = pipeline(
                 "ner",
@@ -4,21 +4,33 @@ PDF auto-fill service with explainable logic.
 This service fills PDF form fields using values from the Company Memory Graph,
 providing explanations for each fill decision.
 """
+import importlib.util
 import logging
 import io
+import threading
 import uuid
+from collections import OrderedDict
+from dataclasses import asdict, dataclass
 from pathlib import Path
-from typing import List, Optional, Tuple
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Tuple
 from sqlalchemy.orm import Session
 
+# PyPDF2 is imported when a filled PDF is first generated, keeping it out of
+# app startup; only check that it is installed here.
+PYPDF2_AVAILABLE = importlib.util.find_spec("PyPDF2") is not None
+if not PYPDF2_AVAILABLE:
+    logging.warning("PyPDF2 not available - PDF auto-fill will be stubbed")
+
+if TYPE_CHECKING:
+    from PyPDF2 import PdfReader
+
 try:
-    from PyPDF2 import PdfReader, PdfWriter
-    PYPDF2_AVAILABLE = True
+    # SIMD-accelerated; falls back to stdlib blake2b when not installed
+    from blake3 import blake3 as _content_hasher
 except ImportError:
-    PYPDF2_AVAILABLE = False
-    logging.warning("PyPDF2 not available - PDF auto-fill will be stubbed")
+    from hashlib import blake2b as _content_hasher
 
-from app.services.pdf_form_detector import PDFFormDetector, PDFFormField
+from app.services.pdf_form_detector import PDFFormDetector, PDFFormField, PDFFormFields
 from app.services.memory_graph import MemoryGraphService
 from app.schemas.autofill import AutoFillResult, FieldExplanation
 from app.storage.filesystem import storage
@@ -26,6 +38,47 @@ from app.models import Document
 
 logger = logging.getLogger(__name__)
 
+# Recent auto-fill results, keyed by (PDF content hash, generate_preview).
+# Results embed Memory Graph values and source document names, so every
+# write that can change them calls invalidate_autofill_cache() after commit.
+# The generation counter stops a result computed before an invalidation from
+# being stored after it.
+_RESULT_CACHE_SIZE = 32
+_result_cache: "OrderedDict[Tuple[str, bool], AutoFillResult]" = OrderedDict()
+_result_cache_generation = 0
+_result_cache_lock = threading.Lock()
+
+
+def invalidate_autofill_cache() -> None:
+    """
+    Drop all cached auto-fill results.
+    
+    Call after committing a change to company facts, or deleting a
+    document (explanations name the document a value came from).
+    """
+    global _result_cache_generation
+    with _result_cache_lock:
+        _result_cache.clear()
+        _result_cache_generation += 1
+
+
+@dataclass(slots=True)
+class _FieldFill:
+    """
+    Internal, unvalidated counterpart of FieldExplanation.
+    
+    Built once per form field while filling; converted to FieldExplanation
+    only when the AutoFillResult is assembled.
+    """
+    field_name: str
+    fact_key: str
+    value: str
+    confidence: float
+    reason: str
+    matched: bool
+    source_document_id: Optional[int] = None
+    source_document_name: Optional[str] = None
+
 
 class PDFAutoFillService:
     """
@@ -63,8 +116,19 @@ class PDFAutoFillService:
         """
         logger.info("Starting PDF auto-fill")
         
+        # Repeat requests for the same PDF skip the whole detect/match/fill
+        # pipeline until the Memory Graph changes
+        cache_key = (_content_hasher(pdf_content).hexdigest(), generate_preview)
+        with _result_cache_lock:
+            generation = _result_cache_generation
+        cached_result = PDFAutoFillService._get_cached_result(cache_key)
+        if cached_result is not None:
+            logger.info("Returning cached auto-fill result")
+            return cached_result
+        
         # Step 1: Detect form fields
-        form_fields = PDFFormDetector.detect_form_fields(pdf_content)
+        # Keep the parsed reader so the fill step doesn't parse the PDF again
+        form_fields, reader, form_text_fields = PDFFormDetector.parse_form_fields(pdf_content)
         logger.info(f"Detected {len(form_fields)} form fields")
         
         if not form_fields:
@@ -78,10 +142,14 @@ class PDFAutoFillService:
         filled_count = 0
         matched_count = 0
         
-        for field in form_fields:
+        # Match the whole names column in one call
+        fact_keys = PDFFormDetector.match_fields_to_fact_keys(form_fields.names)
+        
+        for field, fact_key in zip(form_fields, fact_keys):
             explanation = PDFAutoFillService._fill_single_field(
                 field=field,
-                db=db
+                db=db,
+                fact_key=fact_key
             )
             explanations.append(explanation)
             
@@ -96,41 +164,94 @@ class PDFAutoFillService:
             try:
                 filled_pdf_path = PDFAutoFillService._generate_filled_pdf(
                     pdf_content=pdf_content,
-                    explanations=explanations
+                    explanations=explanations,
+                    reader=reader,
+                    form_text_fields=form_text_fields
                 )
             except Exception as e:
                 logger.error(f"Error generating filled PDF: {e}")
                 filled_pdf_path = None
         
-        return AutoFillResult(
+        # Values were produced by this service, so skip re-validating each one
+        result = AutoFillResult(
             filled_pdf_path=filled_pdf_path,
             fields_detected=len(form_fields),
             fields_matched=matched_count,
             fields_filled=filled_count,
-            explanations=explanations,
+            explanations=[
+                FieldExplanation.model_construct(**asdict(explanation))
+                for explanation in explanations
+            ],
             success=filled_count > 0
         )
+        
+        # A preview that failed to generate is retried on the next request
+        # instead of being served from the cache
+        if not (generate_preview and PYPDF2_AVAILABLE and filled_pdf_path is None):
+            # Cache a copy so the caller can't mutate the cached entry
+            cached_copy = result.model_copy(deep=True)
+            with _result_cache_lock:
+                if generation == _result_cache_generation:
+                    _result_cache[cache_key] = cached_copy
+                    while len(_result_cache) > _RESULT_CACHE_SIZE:
+                        _result_cache.popitem(last=False)
+        
+        return result
+    
+    @staticmethod
+    def _get_cached_result(
+        cache_key: Tuple[str, bool]
+    ) -> Optional[AutoFillResult]:
+        """
+        Look up a previous auto-fill result.
+        
+        Args:
+            cache_key: Key built from PDF content and generate_preview
+            
+        Returns:
+            Deep copy of the cached AutoFillResult, or None on a miss or if
+            its filled PDF preview no longer exists in storage
+        """
+        with _result_cache_lock:
+            result = _result_cache.get(cache_key)
+        if result is None:
+            return None
+        
+        # Checked outside the lock so a slow filesystem doesn't block other requests
+        if result.filled_pdf_path and not storage.exists(result.filled_pdf_path):
+            with _result_cache_lock:
+                if _result_cache.get(cache_key) is result:
+                    del _result_cache[cache_key]
+            return None
+        
+        with _result_cache_lock:
+            if cache_key in _result_cache:
+                _result_cache.move_to_end(cache_key)
+        return result.model_copy(deep=True)
     
     @staticmethod
     def _fill_single_field(
         field: PDFFormField,
-        db: Session
-    ) -> FieldExplanation:
+        db: Session,
+        fact_key: Optional[str] = None
+    ) -> _FieldFill:
         """
         Fill a single PDF form field using Memory Graph.
         
         Args:
             field: PDF form field to fill
             db: Database session
+            fact_key: Fact key already matched for the field (matched here if None)
             
         Returns:
-            FieldExplanation with value and metadata
+            _FieldFill with value and metadata
         """
         # Match field name to fact key
-        fact_key = PDFFormDetector.match_field_to_fact_key(field.field_name)
+        if fact_key is None:
+            fact_key = PDFFormDetector.match_field_to_fact_key(field.field_name)
         
         if not fact_key:
-            return FieldExplanation(
+            return _FieldFill(
                 field_name=field.field_name,
                 fact_key="",
                 value="",
@@ -143,7 +264,7 @@ class PDFAutoFillService:
         fact = MemoryGraphService.get_fact(fact_key, db)
         
         if not fact:
-            return FieldExplanation(
+            return _FieldFill(
                 field_name=field.field_name,
                 fact_key=fact_key,
                 value="",
@@ -192,7 +313,7 @@ class PDFAutoFillService:
         
         reason = ". ".join(reason_parts) + "."
         
-        return FieldExplanation(
+        return _FieldFill(
             field_name=field.field_name,
             fact_key=fact_key,
             value=fact.fact_value,
@@ -206,7 +327,9 @@ class PDFAutoFillService:
     @staticmethod
     def _generate_filled_pdf(
         pdf_content: bytes,
-        explanations: List[FieldExplanation]
+        explanations: List[_FieldFill],
+        reader: Optional["PdfReader"] = None,
+        form_text_fields: Optional[Dict[str, Any]] = None
     ) -> Optional[str]:
         """
         Generate a filled PDF with form fields populated.
@@ -214,6 +337,8 @@ class PDFAutoFillService:
         Args:
             pdf_content: Original PDF content
             explanations: List of field explanations with values
+            reader: Already-parsed reader for pdf_content (parsed here if None)
+            form_text_fields: Text fields already read from reader (read here if None)
             
         Returns:
             Path to filled PDF file, or None if generation fails
@@ -223,11 +348,6 @@ class PDFAutoFillService:
             return None
         
         try:
-            # Read PDF
-            pdf_file = io.BytesIO(pdf_content)
-            reader = PdfReader(pdf_file)
-            writer = PdfWriter()
-            
             # Build mapping of field names to values
             # Map both the PDF field name and the matched fact key
             field_values = {}
@@ -239,22 +359,46 @@ class PDFAutoFillService:
                     if explanation.fact_key:
                         field_values[explanation.fact_key] = explanation.value
             
-            logger.info(f"Filling {len(field_values)} form fields")
+            filename = f"filled_{uuid.uuid4().hex[:8]}.pdf"
+            file_path = f"previews/{filename}"
+            
+            # Nothing to fill: the preview is the original PDF, so skip the
+            # parse/copy/serialize round trip entirely
+            if not field_values:
+                storage.save(pdf_content, file_path)
+                logger.info("No values to fill - saved original PDF as preview: %s", file_path)
+                return file_path
+            
+            logger.info("Filling %d form fields", len(field_values))
+            
+            from PyPDF2 import PdfReader, PdfWriter
+            
+            # Read PDF unless the caller already parsed it
+            if reader is None:
+                pdf_file = io.BytesIO(pdf_content)
+                reader = PdfReader(pdf_file)
+                form_text_fields = None
+            writer = PdfWriter()
             
             # Copy pages first
             if reader.metadata is not None:
                 writer.add_metadata(reader.metadata)
             
-            # Copy all pages
-            for page_num, page in enumerate(reader.pages):
-                writer.add_page(page)
+            # Copy all pages in one call
+            writer.append_pages_from_reader(reader)
+            
+            # Carry the AcroForm over so the output is still an interactive form
+            PDFAutoFillService._copy_acroform(reader, writer)
             
             # Try to fill form fields using PyPDF2's form field update
             # PyPDF2 v3.0+ has better form field support
             try:
                 # Get form fields from the PDF
-                form_fields = reader.get_form_text_fields()
-                logger.info(f"Found {len(form_fields)} form fields in PDF: {list(form_fields.keys())}")
+                if form_text_fields is None:
+                    form_text_fields = reader.get_form_text_fields() or {}
+                form_fields = form_text_fields
+                if logger.isEnabledFor(logging.INFO):
+                    logger.info("Found %d form fields in PDF: %s", len(form_fields), list(form_fields.keys()))
                 
                 # Build a mapping of PDF field names to values
                 # Try to match our field names to PDF field names
@@ -287,16 +431,19 @@ class PDFAutoFillService:
                     
                     if pdf_field_name:
                         fields_to_fill[pdf_field_name] = explanation.value
-                        logger.info(f"Matched '{explanation.field_name}' -> PDF field '{pdf_field_name}' = '{explanation.value}'")
+                        logger.info(
+                            "Matched '%s' -> PDF field '%s' = '%s'",
+                            explanation.field_name, pdf_field_name, explanation.value
+                        )
                 
                 # Fill form fields on each page
                 if fields_to_fill:
                     for page_num, page in enumerate(writer.pages):
                         try:
                             writer.update_page_form_field_values(page, fields_to_fill)
-                            logger.info(f"Filled form fields on page {page_num + 1}")
+                            logger.info("Filled form fields on page %d", page_num + 1)
                         except Exception as page_error:
-                            logger.warning(f"Could not fill fields on page {page_num + 1}: {page_error}")
+                            logger.warning("Could not fill fields on page %d: %s", page_num + 1, page_error)
                 else:
                     logger.warning("No fields matched to fill - field names may not match PDF form field names")
                     
@@ -312,11 +459,9 @@ class PDFAutoFillService:
             filled_pdf_content = filled_pdf_file.getvalue()
             
             # Save filled PDF
-            filename = f"filled_{uuid.uuid4().hex[:8]}.pdf"
-            file_path = f"previews/{filename}"
             storage.save(filled_pdf_content, file_path)
             
-            logger.info(f"Generated filled PDF: {file_path} (filled {len(field_values)} fields)")
+            logger.info("Generated filled PDF: %s (filled %d fields)", file_path, len(field_values))
             return file_path
             
         except Exception as e:
@@ -324,22 +469,47 @@ class PDFAutoFillService:
             return None
     
     @staticmethod
-    def _create_stub_fields() -> List[PDFFormField]:
+    def _copy_acroform(reader: "PdfReader", writer: "PdfWriter") -> None:
+        """
+        Copy the reader's /AcroForm into the writer's document catalog.
+        
+        Must run after the pages are appended, so the clone reuses the widget
+        objects already copied. An indirect /AcroForm is cloned as an indirect
+        object; one held inline in the catalog stays inline.
+        
+        PyPDF2 3.0 has no public accessor for the writer's catalog, and its
+        clone_document_from_reader swaps in the reader's catalog, which write()
+        then ignores, so the form is dropped. The catalog attribute is
+        therefore read here and nowhere else.
+        
+        Args:
+            reader: Source PDF
+            writer: Writer the reader's pages were appended to
+        """
+        from PyPDF2.generic import NameObject
+        
+        acro_form = reader.trailer["/Root"].get("/AcroForm")
+        if acro_form is None:
+            return
+        
+        clone = acro_form.get_object().clone(writer)
+        catalog = writer._root_object
+        catalog[NameObject("/AcroForm")] = getattr(clone, "indirect_reference", None) or clone
+    
+    @staticmethod
+    def _create_stub_fields() -> PDFFormFields:
         """
         Create stub form fields for testing when detection is not available.
         
         Returns:
-            List of stub PDF form fields
+            Stub PDF form fields
         """
         # Common form fields for testing
-        return [
-            PDFFormField("company_name", "text"),
-            PDFFormField("ein", "text"),
-            PDFFormField("address", "text"),
-            PDFFormField("city", "text"),
-            PDFFormField("state", "text"),
-            PDFFormField("zip_code", "text"),
-            PDFFormField("phone", "text"),
-            PDFFormField("email", "text")
-        ]
+        names = ["company_name", "ein", "address", "city", "state", "zip_code", "phone", "email"]
+        return PDFFormFields(
+            names=names,
+            types=["text"] * len(names),
+            values=[None] * len(names),
+            pages=[0] * len(names)
+        )
 
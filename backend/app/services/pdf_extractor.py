@@ -4,11 +4,17 @@ PDF text extraction service.
 This module provides text extraction from PDF files.
 Currently implemented as a stub with placeholder functionality.
 """
-from typing import Optional
+from typing import BinaryIO, List, Optional, Union
 import logging
 
 logger = logging.getLogger(__name__)
 
+# PDF files start with %PDF- version number
+PDF_MAGIC = b"%PDF-"
+
+# Bytes to read from the start of an upload when sniffing its type
+PDF_SNIFF_SIZE = 8
+
 
 class PDFExtractor:
     """
@@ -24,12 +30,14 @@ class PDFExtractor:
     """
     
     @staticmethod
-    def extract_text(file_content: bytes, filename: str) -> Optional[str]:
+    def extract_text(file_content: Union[bytes, BinaryIO], filename: str) -> Optional[str]:
         """
         Extract text from PDF file content.
         
         Args:
-            file_content: Binary content of the PDF file
+            file_content: Binary content of the PDF file, or a seekable binary
+                file object positioned at its start (e.g. a spooled upload),
+                so large files don't have to be read into memory
             filename: Original filename (for logging/debugging)
             
         Returns:
@@ -73,6 +81,36 @@ class PDFExtractor:
         Returns:
             True if file appears to be a PDF
         """
-        # PDF files start with %PDF- version number
-        return file_content.startswith(b"%PDF-")
+        # Compare the header through a view so the payload is never copied
+        return PDFExtractor.is_pdf_prefix(memoryview(file_content)[:len(PDF_MAGIC)])
+    
+    @staticmethod
+    def is_pdf_prefix(head: bytes) -> bool:
+        """
+        Check if the first bytes of a file are a PDF header.
+        
+        Lets callers sniff a stream by reading only its first
+        PDF_SNIFF_SIZE bytes instead of the whole payload.
+        
+        Args:
+            head: Leading bytes of the file
+            
+        Returns:
+            True if file appears to be a PDF
+        """
+        return head[:len(PDF_MAGIC)] == PDF_MAGIC
+    
+    @staticmethod
+    def is_pdf_batch(contents: List[bytes]) -> List[bool]:
+        """
+        Check several file contents for the PDF header at once.
+        
+        Args:
+            contents: Binary contents of the files to check
+            
+        Returns:
+            List of booleans, one per input, True where the file appears to be a PDF
+        """
+        magic_len = len(PDF_MAGIC)
+        return [memoryview(content)[:magic_len] == PDF_MAGIC for content in contents]
 
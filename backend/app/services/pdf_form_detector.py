@@ -3,19 +3,96 @@ PDF form field detection service.
 
 Detects form fields (AcroForm fields) in PDF documents.
 """
+import asyncio
+import functools
+import importlib.util
 import logging
-from typing import List, Dict, Optional
+import multiprocessing
+import os
+import re
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Any, BinaryIO, Iterator, List, Dict, Optional, Tuple, Union
 import io
 
-try:
+from app.services.pdf_extractor import PDFExtractor, PDF_MAGIC
+
+# PyPDF2 is imported on first parse (see _get_pdf_reader) so app startup
+# doesn't pay for it; only check that it is installed here.
+PYPDF2_AVAILABLE = importlib.util.find_spec("PyPDF2") is not None
+if not PYPDF2_AVAILABLE:
+    logging.warning("PyPDF2 not available - PDF form detection will be stubbed")
+
+if TYPE_CHECKING:
     from PyPDF2 import PdfReader
-    PYPDF2_AVAILABLE = True
+
+try:
+    # Optional: C automaton for multi-pattern substring search
+    import ahocorasick
+    AHOCORASICK_AVAILABLE = True
 except ImportError:
-    PYPDF2_AVAILABLE = False
-    logging.warning("PyPDF2 not available - PDF form detection will be stubbed")
+    AHOCORASICK_AVAILABLE = False
+
+try:
+    # Optional: C++ fuzzy matching for typo-tolerant field names
+    from rapidfuzz import fuzz, process
+    RAPIDFUZZ_AVAILABLE = True
+except ImportError:
+    RAPIDFUZZ_AVAILABLE = False
+
+try:
+    # Optional: PyMuPDF's C backend parses forms much faster than PyPDF2
+    try:
+        import pymupdf as fitz
+    except ImportError:
+        import fitz  # PyMuPDF < 1.24.3
+    PYMUPDF_AVAILABLE = True
+except ImportError:
+    PYMUPDF_AVAILABLE = False
 
 logger = logging.getLogger(__name__)
 
+# PdfReader class, memoized by _get_pdf_reader
+_pdf_reader = None
+
+
+def _get_pdf_reader():
+    """
+    Import PyPDF2's PdfReader on first use.
+    
+    Returns:
+        The PdfReader class
+    """
+    global _pdf_reader
+    if _pdf_reader is None:
+        from PyPDF2 import PdfReader
+        _pdf_reader = PdfReader
+    return _pdf_reader
+
+# PyMuPDF widget type -> PDFFormField.field_type
+_PYMUPDF_WIDGET_TYPES = {
+    fitz.PDF_WIDGET_TYPE_TEXT: "text",
+    fitz.PDF_WIDGET_TYPE_BUTTON: "button",
+    fitz.PDF_WIDGET_TYPE_CHECKBOX: "checkbox",
+    fitz.PDF_WIDGET_TYPE_RADIOBUTTON: "radio",
+    fitz.PDF_WIDGET_TYPE_COMBOBOX: "choice",
+    fitz.PDF_WIDGET_TYPE_LISTBOX: "choice",
+    fitz.PDF_WIDGET_TYPE_SIGNATURE: "signature",
+} if PYMUPDF_AVAILABLE else {}
+
+# AcroForm /FT value -> PDFFormField.field_type (buttons are refined by /Ff)
+_ACROFORM_FIELD_TYPES = {
+    "/Tx": "text",
+    "/Btn": "button",
+    "/Ch": "choice",
+    "/Sig": "signature",
+}
+
+# /Ff flag bits that distinguish button kinds (PDF 1.7, table 226)
+_FF_RADIO = 1 << 15
+_FF_PUSHBUTTON = 1 << 16
+
 
 class PDFFormField:
     """
@@ -37,6 +114,457 @@ class PDFFormField:
         return f"PDFFormField(name='{self.field_name}', type='{self.field_type}', value='{self.value}')"
 
 
+@dataclass
+class PDFFormFields:
+    """
+    Form fields of one PDF, stored column-wise.
+    
+    Large forms (IRS forms can have over a thousand fields) are kept as four
+    parallel lists instead of one object per field, and the names column can
+    be matched in one call (PDFFormDetector.match_fields_to_fact_keys).
+    Iterating, indexing and len() behave like a list of PDFFormField, so
+    callers written against the old list return type keep working.
+    """
+    names: List[str] = field(default_factory=list)
+    types: List[str] = field(default_factory=list)
+    values: List[Optional[str]] = field(default_factory=list)
+    pages: List[int] = field(default_factory=list)
+    
+    def append(
+        self,
+        field_name: str,
+        field_type: str,
+        value: Optional[str] = None,
+        page_number: int = 0
+    ) -> None:
+        """Add one field to the end of every column."""
+        self.names.append(field_name)
+        self.types.append(field_type)
+        self.values.append(value)
+        self.pages.append(page_number)
+    
+    def iter_records(self) -> Iterator[PDFFormField]:
+        """
+        Iterate over the fields as PDFFormField objects.
+        
+        Returns:
+            Iterator of PDFFormField, built on the fly
+        """
+        for name, field_type, value, page_number in zip(self.names, self.types, self.values, self.pages):
+            yield PDFFormField(name, field_type, value, page_number)
+    
+    def __iter__(self) -> Iterator[PDFFormField]:
+        return self.iter_records()
+    
+    def __len__(self) -> int:
+        return len(self.names)
+    
+    def __getitem__(self, index: Union[int, slice]) -> Union[PDFFormField, "PDFFormFields"]:
+        # Like a list, a slice returns a new container of the selected fields
+        if isinstance(index, slice):
+            return PDFFormFields(self.names[index], self.types[index], self.values[index], self.pages[index])
+        return PDFFormField(self.names[index], self.types[index], self.values[index], self.pages[index])
+
+
+# Mapping of Memory Graph fact keys to the PDF field name patterns that map to
+# them (see PDFFormDetector.get_field_mapping). Built once at import, along with
+# the lookup tables match_field_to_fact_key uses.
+_FIELD_MAPPING: Dict[str, List[str]] = {
+    # Company name variations
+    # Maps various ways companies name their "company name" field
+    "company_name": [
+        "company_name", "company name", 
+        "business_name", "business name", 
+        "legal_name", "legal name", 
+        "entity_name", "entity name",
+        "name_of_company", "name of company",
+        "company", "business", "entity"
+    ],
+
+    # EIN (Employer Identification Number) variations
+    # Maps various tax ID field names
+    "ein": [
+        "ein", 
+        "employer_id", "employer id", 
+        "tax_id", "tax id", "taxid",
+        "federal_id", "federal id", 
+        "fein", 
+        "employer_identification_number", "employer identification number",
+        "federal_tax_id", "federal tax id"
+    ],
+
+    # Address line 1 variations
+    # Maps street address fields
+    "address_line_1": [
+        "address", 
+        "street_address", "street address", 
+        "address_line_1", "address line 1", 
+        "address1", 
+        "street", 
+        "mailing_address", "mailing address",
+        "physical_address", "physical address"
+    ],
+
+    # City (simple, usually consistent)
+    "city": ["city"],
+
+    # State/Province variations
+    "state": ["state", "province"],
+
+    # ZIP/Postal code variations
+    "zip_code": [
+        "zip", 
+        "zip_code", "zip code", 
+        "postal_code", "postal code",
+        "zipcode", "postalcode",
+        "postal"
+    ],
+
+    # Phone number variations
+    "phone": [
+        "phone", 
+        "phone_number", "phone number", 
+        "telephone", "tel",
+        "contact_phone", "contact phone",
+        "phone_num", "phone num"
+    ],
+
+    # Email variations
+    "email": [
+        "email", 
+        "email_address", "email address", 
+        "e_mail", "e-mail",
+        "email_addr", "email addr"
+    ],
+
+    # Website variations
+    "website": [
+        "website", 
+        "web_site", "web site", 
+        "url", 
+        "homepage"
+    ],
+
+    # Incorporation date variations
+    "incorporation_date": [
+        "incorporation_date", "incorporation date", 
+        "date_of_incorporation", "date of incorporation", 
+        "inc_date", "inc date",
+        "date_incorporated", "date incorporated"
+    ],
+
+    # State of incorporation variations
+    "state_of_incorporation": [
+        "state_of_incorporation", "state of incorporation",
+        "incorporation_state", "incorporation state", 
+        "inc_state", "inc state", 
+        "state_incorporated", "state incorporated",
+        "incorporated_in", "incorporated in"
+    ]
+}
+
+# Every (pattern, fact_key) pair, in mapping order (earlier fact keys win)
+_PATTERNS: List[Tuple[str, str]] = [
+    (pattern, fact_key)
+    for fact_key, patterns in _FIELD_MAPPING.items()
+    for pattern in patterns
+]
+
+# Inverted index for exact matching: pattern -> first fact key listing it
+_PATTERN_TO_FACT: Dict[str, str] = {}
+for _pattern, _fact_key in _PATTERNS:
+    _PATTERN_TO_FACT.setdefault(_pattern, _fact_key)
+
+# Position of each pattern's first occurrence, used to break length ties
+_PATTERN_PRIORITY: Dict[str, int] = {}
+for _priority, (_pattern, _fact_key) in enumerate(_PATTERNS):
+    _PATTERN_PRIORITY.setdefault(_pattern, _priority)
+
+# Single compiled alternation over all patterns, longest first. The lookahead
+# makes finditer report the longest pattern starting at every position, so the
+# whole scan runs inside the regex engine. Used when pyahocorasick is absent.
+_PATTERN_REGEX = re.compile(
+    "(?=("
+    + "|".join(
+        re.escape(pattern)
+        for pattern in sorted(_PATTERN_TO_FACT, key=lambda p: (-len(p), _PATTERN_PRIORITY[p]))
+    )
+    + "))"
+)
+
+# Aho-Corasick automaton over all patterns, so every pattern contained in a
+# field name is found in one pass. Values are (length, priority, pattern,
+# fact_key) where priority is the pattern's position in _PATTERNS.
+_PATTERN_AUTOMATON = None
+if AHOCORASICK_AVAILABLE:
+    _PATTERN_AUTOMATON = ahocorasick.Automaton()
+    for _priority, (_pattern, _fact_key) in enumerate(_PATTERNS):
+        if _PATTERN_TO_FACT[_pattern] == _fact_key and _pattern not in _PATTERN_AUTOMATON:
+            _PATTERN_AUTOMATON.add_word(_pattern, (len(_pattern), _priority, _pattern, _fact_key))
+    _PATTERN_AUTOMATON.make_automaton()
+
+# Candidate patterns for fuzzy matching: only the forms a normalized field
+# name can take (no underscores or dashes), in mapping order
+_FUZZY_PATTERNS: List[str] = [
+    pattern for pattern in _PATTERN_TO_FACT
+    if "_" not in pattern and "-" not in pattern
+]
+
+# Minimum rapidfuzz token_sort_ratio score for a fuzzy match
+FUZZY_SCORE_CUTOFF = 75
+
+# Patterns pre-split into words for word-overlap matching. Only patterns of
+# two or more words can share the required 2 words with a field name, so
+# single-word (and underscore-joined) patterns are left out.
+_PATTERN_WORDS: List[Tuple[str, str, frozenset]] = [
+    (pattern, fact_key, frozenset(pattern.split()))
+    for pattern, fact_key in _PATTERNS
+    if len(pattern.split()) >= 2
+]
+
+# Inverted index for word-overlap matching: word -> positions in
+# _PATTERN_WORDS of the patterns containing it, in ascending order
+_WORD_TO_PATTERNS: Dict[str, List[int]] = {}
+for _index, (_pattern, _fact_key, _words) in enumerate(_PATTERN_WORDS):
+    for _word in _words:
+        _WORD_TO_PATTERNS.setdefault(_word, []).append(_index)
+
+# Field-name separators mapped to spaces in a single pass
+_SEPARATOR_TABLE = str.maketrans("_-", "  ")
+
+
+def _find_contained_pattern(normalized: str) -> Optional[Tuple[str, str]]:
+    """
+    Find the longest known pattern contained in a normalized field name.
+    
+    Ties go to the pattern listed first in the mapping.
+    
+    Args:
+        normalized: Normalized PDF field name
+        
+    Returns:
+        Tuple of (pattern, fact_key), or None if no pattern is contained
+    """
+    if _PATTERN_AUTOMATON is not None:
+        best = None
+        for _, hit in _PATTERN_AUTOMATON.iter(normalized):
+            if best is None or (hit[0], -hit[1]) > (best[0], -best[1]):
+                best = hit
+        return (best[2], best[3]) if best else None
+    
+    hits = {m.group(1) for m in _PATTERN_REGEX.finditer(normalized)}
+    if not hits:
+        return None
+    pattern = min(hits, key=lambda p: (-len(p), _PATTERN_PRIORITY[p]))
+    return (pattern, _PATTERN_TO_FACT[pattern])
+
+
+def _walk_fields(
+    node: Any,
+    page_map: Dict[int, int],
+    inherited_type: Optional[str] = None,
+    inherited_flags: int = 0
+):
+    """
+    Walk an AcroForm field tree in a single pass.
+    
+    Resolves indirect objects, recurses into /Kids and yields one entry per
+    terminal field (a named field with no named kids). /FT and /Ff are
+    inheritable, so they are passed down from parent fields.
+    
+    Args:
+        node: Field dictionary or indirect reference to one
+        page_map: Page object number -> page index, to resolve /P
+        inherited_type: /FT of the nearest ancestor that sets it
+        inherited_flags: /Ff of the nearest ancestor that sets it
+        
+    Yields:
+        Tuples of (name, field_type, flags, value, page_number) where
+        field_type is the raw /FT name (or None) and value is the raw /V
+        (or None)
+    """
+    # Indexing (unlike .get) resolves indirect values such as a /Kids array
+    # stored as a separate object
+    field = node.get_object()
+    field_type = field["/FT"] if "/FT" in field else inherited_type
+    flags = int(field["/Ff"]) if "/Ff" in field else inherited_flags
+    kids = [kid.get_object() for kid in field["/Kids"]] if "/Kids" in field else []
+    named_kids = [kid for kid in kids if "/T" in kid]
+    
+    if named_kids:
+        for kid in named_kids:
+            yield from _walk_fields(kid, page_map, field_type, flags)
+        return
+    
+    if "/T" not in field:
+        return
+    name = field["/T"]
+    
+    # The page is on the field itself when it is merged with its widget,
+    # otherwise on its first (unnamed) widget kid
+    page_ref = field.get("/P")
+    if page_ref is None and kids:
+        page_ref = kids[0].get("/P")
+    page_number = 0
+    if page_ref is not None and hasattr(page_ref, "idnum"):
+        page_number = page_map.get(page_ref.idnum, 0)
+    
+    value = field["/V"] if "/V" in field else None
+    yield name, field_type, flags, value, page_number
+
+
+def _acroform_field_type(field_type: Optional[str], flags: int) -> str:
+    """
+    Map a raw AcroForm /FT (and /Ff flags) to a PDFFormField.field_type.
+    
+    Args:
+        field_type: Raw /FT name, e.g. "/Tx"
+        flags: Field flags (/Ff)
+        
+    Returns:
+        Field type string ('text', 'checkbox', 'radio', 'button', 'choice',
+        'signature' or 'other')
+    """
+    if field_type == "/Btn":
+        if flags & _FF_PUSHBUTTON:
+            return "button"
+        return "radio" if flags & _FF_RADIO else "checkbox"
+    return _ACROFORM_FIELD_TYPES.get(field_type, "other")
+
+
+@functools.lru_cache(maxsize=4096)
+def _match_field_to_fact_key(pdf_field_name: str) -> Optional[str]:
+    """
+    Cached implementation of PDFFormDetector.match_field_to_fact_key.
+    
+    Field names recur across documents (company_name, EIN, Address1), so
+    repeat lookups are served from the cache. The pattern tables are built
+    once at import and never change, so cached results never go stale.
+    
+    Args:
+        pdf_field_name: Name of the PDF form field
+        
+    Returns:
+        Matched fact key, or None if no match found
+    """
+    if not pdf_field_name:
+        return None
+    
+    # Step 1: Normalize field name for matching
+    # Convert to lowercase, remove underscores/dashes, trim whitespace
+    normalized = pdf_field_name.lower().strip().translate(_SEPARATOR_TABLE)
+    
+    # Step 2: Try exact match first (fastest, most accurate)
+    # Single lookup in the precomputed pattern -> fact key index
+    fact_key = _PATTERN_TO_FACT.get(normalized)
+    if fact_key:
+        logger.debug("Exact match: %r → %r", pdf_field_name, fact_key)
+        return fact_key
+    
+    # Step 3: Try partial match (handles variations)
+    # First: the longest pattern contained in the normalized name
+    contained = _find_contained_pattern(normalized)
+    if contained:
+        pattern, fact_key = contained
+        logger.debug("Partial match: %r → %r (pattern: %r)", pdf_field_name, fact_key, pattern)
+        return fact_key
+    
+    # Then: a pattern containing the normalized name (e.g. "tax" in "tax id")
+    for pattern, fact_key in _PATTERNS:
+        if normalized in pattern:
+            logger.debug("Partial match: %r → %r (pattern: %r)", pdf_field_name, fact_key, pattern)
+            return fact_key
+    
+    # Step 4: Try fuzzy matching (handles typos and reordered words)
+    if RAPIDFUZZ_AVAILABLE:
+        hit = process.extractOne(
+            normalized, _FUZZY_PATTERNS,
+            scorer=fuzz.token_sort_ratio, score_cutoff=FUZZY_SCORE_CUTOFF
+        )
+        if hit:
+            fact_key = _PATTERN_TO_FACT[hit[0]]
+            logger.debug("Fuzzy match: %r → %r (pattern: %r, score: %.0f)", pdf_field_name, fact_key, hit[0], hit[1])
+            return fact_key
+        
+        logger.debug("No match found for PDF field: %r (normalized: %r)", pdf_field_name, normalized)
+        return None
+    
+    # Without rapidfuzz: word-by-word matching (handles multi-word variations)
+    # Split into words and check for significant overlap (2+ words)
+    # Count shared words per pattern through the inverted index, touching
+    # only patterns that share at least one word with the field name
+    overlap: Dict[int, int] = {}
+    for word in set(normalized.split()):
+        for index in _WORD_TO_PATTERNS.get(word, ()):
+            overlap[index] = overlap.get(index, 0) + 1
+    
+    # The first pattern in mapping order with 2+ common words wins
+    matches = [index for index, count in overlap.items() if count >= 2]
+    if matches:
+        pattern, fact_key, pattern_words = _PATTERN_WORDS[min(matches)]
+        if logger.isEnabledFor(logging.DEBUG):
+            common_words = set(normalized.split()) & pattern_words
+            logger.debug("Word match: %r → %r (common words: %s)", pdf_field_name, fact_key, common_words)
+        return fact_key
+    
+    # No match found
+    logger.debug("No match found for PDF field: %r (normalized: %r)", pdf_field_name, normalized)
+    return None
+
+
+# Process pool for batch detection, created on first use. PyPDF2 parsing is
+# pure Python and holds the GIL, so separate processes are needed to use
+# more than one core.
+_detection_pool: Optional[ProcessPoolExecutor] = None
+_detection_pool_lock = threading.Lock()
+
+
+def _get_detection_pool() -> ProcessPoolExecutor:
+    """
+    Get the shared batch-detection process pool, creating it if needed.
+    
+    Workers are spawned rather than forked: the server process is
+    multithreaded, and a forked child can inherit locks held by other threads.
+    
+    Returns:
+        ProcessPoolExecutor with one worker per CPU
+    """
+    global _detection_pool
+    if _detection_pool is None:
+        with _detection_pool_lock:
+            if _detection_pool is None:
+                _detection_pool = ProcessPoolExecutor(
+                    max_workers=os.cpu_count(),
+                    mp_context=multiprocessing.get_context("spawn")
+                )
+    return _detection_pool
+
+
+def shutdown_detection_pool() -> None:
+    """Shut down the batch-detection process pool, if it was started."""
+    global _detection_pool
+    with _detection_pool_lock:
+        pool, _detection_pool = _detection_pool, None
+    if pool is not None:
+        pool.shutdown()
+
+
+def _detect_one(pdf_content: bytes) -> "PDFFormFields":
+    """
+    Detect form fields in one PDF inside a pool worker.
+    
+    The column-wise result is four plain lists, so it pickles cheaply back
+    to the parent process.
+    
+    Args:
+        pdf_content: Binary content of the PDF file
+        
+    Returns:
+        Detected form fields
+    """
+    return PDFFormDetector.detect_form_fields(pdf_content)
+
+
 class PDFFormDetector:
     """
     Service for detecting form fields in PDF documents.
@@ -48,15 +576,17 @@ class PDFFormDetector:
     """
     
     @staticmethod
-    def detect_form_fields(pdf_content: bytes) -> List[PDFFormField]:
+    def detect_form_fields(pdf_content: Union[bytes, BinaryIO]) -> PDFFormFields:
         """
         Detect all form fields in a PDF document.
         
         Args:
-            pdf_content: Binary content of the PDF file
+            pdf_content: Binary content of the PDF file, or a seekable binary
+                file object positioned at its start (e.g. an upload's spooled
+                file or FileStorage.read_stream) so it is parsed in place
             
         Returns:
-            List of detected form fields
+            Detected form fields (column-wise; iterates as PDFFormField)
             
         TODO: Enhance detection:
         1. Use pdfplumber for better field detection
@@ -65,59 +595,191 @@ class PDFFormDetector:
         4. Handle nested fields
         5. Detect required vs optional fields
         """
+        if PYMUPDF_AVAILABLE:
+            if isinstance(pdf_content, (bytes, bytearray)):
+                pdf_bytes = pdf_content
+            else:
+                # PyMuPDF parses from a memory buffer
+                pdf_bytes = pdf_content.read()
+                pdf_content.seek(0)
+            form_fields = PDFFormDetector._detect_form_fields_pymupdf(pdf_bytes)
+            if form_fields is not None:
+                return form_fields
+        
+        form_fields, _, _ = PDFFormDetector.parse_form_fields(pdf_content)
+        return form_fields
+    
+    @staticmethod
+    def detect_form_fields_batch(pdfs: List[bytes]) -> List[PDFFormFields]:
+        """
+        Detect form fields in several PDFs in parallel.
+        
+        Each PDF is parsed in a separate worker process. A single PDF is
+        parsed inline, since the pool round trip would only add overhead.
+        
+        Args:
+            pdfs: Binary contents of the PDF files
+            
+        Returns:
+            Detected form fields per PDF, in input order
+        """
+        if len(pdfs) <= 1:
+            return [PDFFormDetector.detect_form_fields(pdf_content) for pdf_content in pdfs]
+        
+        pool = _get_detection_pool()
+        return list(pool.map(_detect_one, pdfs))
+    
+    @staticmethod
+    async def detect_form_fields_batch_async(
+        pdfs: List[Union[bytes, BinaryIO]]
+    ) -> List[PDFFormFields]:
+        """
+        Async variant of detect_form_fields_batch for request handlers.
+        
+        Waits on the worker processes without blocking the event loop. A
+        single PDF is parsed inline in a thread, in place if it is a file.
+        With several, each file is handed to the pool as soon as it is read,
+        so parsing overlaps reading the rest.
+        
+        Args:
+            pdfs: Binary contents of the PDF files, or seekable binary file
+                objects positioned at their start (e.g. upload spooled files)
+            
+        Returns:
+            Detected form fields per PDF, in input order
+        """
+        if len(pdfs) <= 1:
+            return [
+                await asyncio.to_thread(PDFFormDetector.detect_form_fields, pdf_content)
+                for pdf_content in pdfs
+            ]
+        
+        loop = asyncio.get_running_loop()
+        pool = _get_detection_pool()
+        pending = []
+        for pdf_content in pdfs:
+            if not isinstance(pdf_content, (bytes, bytearray)):
+                # Worker processes need the bytes; a file object can't be sent
+                pdf_content = await asyncio.to_thread(pdf_content.read)
+            pending.append(loop.run_in_executor(pool, _detect_one, pdf_content))
+        return list(await asyncio.gather(*pending))
+    
+    @staticmethod
+    def _detect_form_fields_pymupdf(pdf_content: bytes) -> Optional[PDFFormFields]:
+        """
+        Detect form fields using PyMuPDF widgets.
+        
+        Reports every widget type (not just text) along with its page number.
+        
+        Args:
+            pdf_content: Binary content of the PDF file
+            
+        Returns:
+            Detected form fields, or None if PyMuPDF could not parse
+            the PDF (callers fall back to PyPDF2)
+        """
+        try:
+            form_fields = PDFFormFields()
+            with fitz.open(stream=pdf_content, filetype="pdf") as doc:
+                # Not a form: skip loading every page to look for widgets
+                pages = enumerate(doc) if doc.is_form_pdf else ()
+                for page_number, page in pages:
+                    for widget in page.widgets():
+                        value = widget.field_value
+                        form_fields.append(
+                            field_name=widget.field_name,
+                            field_type=_PYMUPDF_WIDGET_TYPES.get(widget.field_type, "other"),
+                            value=str(value) if value not in (None, "") else None,
+                            page_number=page_number
+                        )
+        except Exception as e:
+            logger.warning("PyMuPDF could not read form fields, falling back to PyPDF2: %s", e)
+            return None
+        
+        if form_fields:
+            logger.info("Found %d form fields", len(form_fields))
+        else:
+            logger.warning("No form fields detected in PDF - document may not have interactive form fields")
+        return form_fields
+    
+    @staticmethod
+    def parse_form_fields(
+        pdf_content: Union[bytes, BinaryIO]
+    ) -> Tuple[PDFFormFields, Optional["PdfReader"], Dict[str, Any]]:
+        """
+        Parse a PDF once and detect its form fields.
+        
+        Unlike detect_form_fields, this also returns the parsed reader and the
+        raw text-field dictionary so callers that go on to fill the form
+        (e.g. PDFAutoFillService) can reuse them instead of re-parsing.
+        
+        Args:
+            pdf_content: Binary content of the PDF file, or a seekable binary
+                file object that PyPDF2 reads from directly. The returned
+                reader reads from it lazily, so keep it open while the
+                reader is in use.
+            
+        Returns:
+            Tuple of (detected form fields, parsed PdfReader or None if the PDF
+            could not be parsed, dict of text field name -> value)
+        """
         if not PYPDF2_AVAILABLE:
             logger.warning("PyPDF2 not available - returning empty form fields")
-            return []
+            return PDFFormFields(), None, {}
         
         try:
-            pdf_file = io.BytesIO(pdf_content)
-            reader = PdfReader(pdf_file)
-            
-            form_fields = []
+            # BytesIO shares the bytes buffer, so wrapping costs no copy;
+            # file objects are read in place without loading them up front
+            if isinstance(pdf_content, (bytes, bytearray)):
+                pdf_content = io.BytesIO(pdf_content)
+            reader = _get_pdf_reader()(pdf_content)
+        except Exception as e:
+            logger.error("Error detecting form fields: %s", e)
+            return PDFFormFields(), None, {}
+        
+        try:
+            form_fields = PDFFormFields()
+            text_fields = {}
             
-            # Get form fields using PyPDF2's get_form_text_fields
-            # This returns a dict of field_name -> value
-            try:
-                text_fields = reader.get_form_text_fields()
-                if text_fields:
-                    for field_name, value in text_fields.items():
-                        form_fields.append(PDFFormField(
-                            field_name=field_name,
-                            field_type="text",
-                            value=value,
-                            page_number=0  # PyPDF2 doesn't provide page number easily
-                        ))
-                    logger.info(f"Found {len(form_fields)} text form fields")
-            except Exception as e:
-                logger.warning(f"Could not extract text form fields: {e}")
+            # Most uploads are not forms: without an AcroForm /Fields array
+            # there is nothing to find, so skip loading the page tree and
+            # walking fields altogether
+            root = reader.trailer["/Root"]
+            acro_form = root["/AcroForm"] if "/AcroForm" in root else None
+            if acro_form is None or not acro_form.get("/Fields"):
+                logger.warning("No form fields detected in PDF - document may not have interactive form fields")
+                return form_fields, reader, text_fields
             
-            # Try to get checkboxes and other field types
-            # PyPDF2's API for this is limited, but we can try
-            try:
-                # Access the root to find AcroForm
-                if hasattr(reader, 'trailer') and reader.trailer:
-                    root = reader.trailer.get('/Root', {})
-                    if '/AcroForm' in root:
-                        acro_form = root['/AcroForm']
-                        if '/Fields' in acro_form:
-                            fields_array = acro_form['/Fields']
-                            # Process fields array to find checkboxes and other types
-                            # This is a simplified approach - PyPDF2's field access is limited
-                            logger.debug("Found AcroForm with fields")
-            except Exception as e:
-                logger.debug(f"Could not access AcroForm fields: {e}")
+            # Walk the AcroForm field tree once, collecting every field with
+            # its type, value and page, and the text fields autofill fills in
+            page_map = {
+                page.indirect_reference.idnum: page_number
+                for page_number, page in enumerate(reader.pages)
+                if page.indirect_reference is not None
+            }
+            for node in acro_form["/Fields"]:
+                for name, field_type, flags, value, page_number in _walk_fields(node, page_map):
+                    if field_type == "/Tx":
+                        text_fields[name] = value
+                    form_fields.append(
+                        field_name=name,
+                        field_type=_acroform_field_type(field_type, flags),
+                        value=str(value) if value is not None else None,
+                        page_number=page_number
+                    )
             
             # If we found fields, return them
             if form_fields:
-                return form_fields
+                logger.info("Found %d form fields", len(form_fields))
+                return form_fields, reader, text_fields
             
             # If no fields found, log a warning
             logger.warning("No form fields detected in PDF - document may not have interactive form fields")
-            return []
+            return form_fields, reader, text_fields
             
         except Exception as e:
-            logger.error(f"Error detecting form fields: {e}")
-            return []
+            logger.error("Error detecting form fields: %s", e)
+            return PDFFormFields(), reader, {}
     
     @staticmethod
     def get_field_mapping() -> Dict[str, List[str]]:
@@ -137,7 +799,8 @@ class PDFFormDetector:
         3. Supports exact, partial, and word-based matching
         
         Returns:
-            Dictionary mapping fact keys to lists of PDF field name patterns
+            Dictionary mapping fact keys to lists of PDF field name patterns.
+            This is the shared module-level mapping; callers must not mutate it.
             
         Example:
             {
@@ -145,99 +808,7 @@ class PDFFormDetector:
                 "ein": ["ein", "employer_id", "tax_id", ...]
             }
         """
-        return {
-            # Company name variations
-            # Maps various ways companies name their "company name" field
-            "company_name": [
-                "company_name", "company name", 
-                "business_name", "business name", 
-                "legal_name", "legal name", 
-                "entity_name", "entity name",
-                "name_of_company", "name of company",
-                "company", "business", "entity"
-            ],
-            
-            # EIN (Employer Identification Number) variations
-            # Maps various tax ID field names
-            "ein": [
-                "ein", 
-                "employer_id", "employer id", 
-                "tax_id", "tax id", "taxid",
-                "federal_id", "federal id", 
-                "fein", 
-                "employer_identification_number", "employer identification number",
-                "federal_tax_id", "federal tax id"
-            ],
-            
-            # Address line 1 variations
-            # Maps street address fields
-            "address_line_1": [
-                "address", 
-                "street_address", "street address", 
-                "address_line_1", "address line 1", 
-                "address1", 
-                "street", 
-                "mailing_address", "mailing address",
-                "physical_address", "physical address"
-            ],
-            
-            # City (simple, usually consistent)
-            "city": ["city"],
-            
-            # State/Province variations
-            "state": ["state", "province"],
-            
-            # ZIP/Postal code variations
-            "zip_code": [
-                "zip", 
-                "zip_code", "zip code", 
-                "postal_code", "postal code",
-                "zipcode", "postalcode",
-                "postal"
-            ],
-            
-            # Phone number variations
-            "phone": [
-                "phone", 
-                "phone_number", "phone number", 
-                "telephone", "tel",
-                "contact_phone", "contact phone",
-                "phone_num", "phone num"
-            ],
-            
-            # Email variations
-            "email": [
-                "email", 
-                "email_address", "email address", 
-                "e_mail", "e-mail",
-                "email_addr", "email addr"
-            ],
-            
-            # Website variations
-            "website": [
-                "website", 
-                "web_site", "web site", 
-                "url", 
-                "homepage"
-            ],
-            
-            # Incorporation date variations
-            "incorporation_date": [
-                "incorporation_date", "incorporation date", 
-                "date_of_incorporation", "date of incorporation", 
-                "inc_date", "inc date",
-                "date_incorporated", "date incorporated"
-            ],
-            
-            # State of incorporation variations
-            "state_of_incorporation": [
-                "state_of_incorporation", "state of incorporation",
-                "incorporation_state", "incorporation state", 
-                "inc_state", "inc state", 
-                "state_incorporated", "state incorporated",
-                "incorporated_in", "incorporated in"
-            ]
-        }
+        return _FIELD_MAPPING
     
     @staticmethod
     def match_field_to_fact_key(pdf_field_name: str) -> Optional[str]:
@@ -246,8 +817,9 @@ class PDFFormDetector:
         
         Uses a three-tier matching strategy to handle variations:
         1. Exact match: Direct pattern match
-        2. Partial match: Substring matching
-        3. Word matching: Significant word overlap
+        2. Partial match: Substring matching (longest contained pattern wins)
+        3. Fuzzy matching: rapidfuzz token-sort similarity when installed,
+           otherwise significant word overlap
         
         Args:
             pdf_field_name: Name of the PDF form field (e.g., "company_name", "employer_id")
@@ -262,51 +834,24 @@ class PDFFormDetector:
             - "phone_number" → "phone" (pattern match)
             
         TODO: Enhance matching:
-        1. Use fuzzy string matching (fuzzywuzzy, rapidfuzz) for typos
-        2. Use ML-based field name classification
-        3. Learn from user corrections
-        4. Handle abbreviations and variations better
+        1. Use ML-based field name classification
+        2. Learn from user corrections
+        3. Handle abbreviations and variations better
         """
-        if not pdf_field_name:
-            return None
-        
-        # Step 1: Normalize field name for matching
-        # Convert to lowercase, remove underscores/dashes, trim whitespace
-        normalized = pdf_field_name.lower().strip().replace("_", " ").replace("-", " ")
-        
-        # Get field mapping dictionary
-        mapping = PDFFormDetector.get_field_mapping()
-        
-        # Step 2: Try exact match first (fastest, most accurate)
-        # Check if normalized name is in any pattern list
-        for fact_key, patterns in mapping.items():
-            if normalized in patterns:
-                logger.debug(f"Exact match: '{pdf_field_name}' → '{fact_key}'")
-                return fact_key
-        
-        # Step 3: Try partial match (handles variations)
-        # Check if normalized name contains any pattern, or vice versa
-        for fact_key, patterns in mapping.items():
-            for pattern in patterns:
-                if pattern in normalized or normalized in pattern:
-                    logger.debug(f"Partial match: '{pdf_field_name}' → '{fact_key}' (pattern: '{pattern}')")
-                    return fact_key
-        
-        # Step 4: Try word-by-word matching (handles multi-word variations)
-        # Split into words and check for significant overlap (2+ words)
-        words = normalized.split()
-        for fact_key, patterns in mapping.items():
-            for pattern in patterns:
-                pattern_words = pattern.split()
-                # Check if at least 2 significant words match
-                common_words = set(words) & set(pattern_words)
-                if len(common_words) >= 2:
-                    logger.debug(f"Word match: '{pdf_field_name}' → '{fact_key}' (common words: {common_words})")
-                    return fact_key
+        return _match_field_to_fact_key(pdf_field_name)
+    
+    @staticmethod
+    def match_fields_to_fact_keys(names: List[str]) -> List[Optional[str]]:
+        """
+        Match a column of PDF form field names to Memory Graph fact keys.
         
-        # No match found
-        logger.debug(f"No match found for PDF field: '{pdf_field_name}' (normalized: '{normalized}')")
-        return None
+        Args:
+            names: PDF form field names, e.g. PDFFormFields.names
+            
+        Returns:
+            Matched fact key (or None) for each name, in input order
+        """
+        return [_match_field_to_fact_key(name) for name in names]
     
     @staticmethod
     def is_pdf(file_content: bytes) -> bool:
@@ -319,5 +864,18 @@ class PDFFormDetector:
         Returns:
             True if file appears to be a valid PDF
         """
-        return file_content.startswith(b"%PDF-")
+        return PDFFormDetector.is_pdf_prefix(file_content[:len(PDF_MAGIC)])
+    
+    @staticmethod
+    def is_pdf_prefix(head: bytes) -> bool:
+        """
+        Check if the first bytes of a file are a PDF header.
+        
+        Args:
+            head: Leading bytes of the file (PDF_SNIFF_SIZE is enough)
+            
+        Returns:
+            True if file appears to be a valid PDF
+        """
+        return PDFExtractor.is_pdf_prefix(head)
 
@@ -1,7 +1,8 @@
 """
 Prompt templates for LLM-based field extraction.
 """
-from typing import Dict, Any
+import functools
+from typing import Dict, Any, List, Optional, Tuple
 
 
 # List of fields we want to extract
@@ -81,27 +82,31 @@ EXTRACTION_FIELDS = [
 ]
 
 
-def build_extraction_prompt(document_text: str) -> str:
-    """
-    Build the prompt for LLM field extraction.
-    
-    Args:
-        document_text: The parsed text from the document
-        
-    Returns:
-        Formatted prompt string
-    """
-    fields_description = "\n".join([
+# Field definitions by name, for prompts that request a subset of fields
+_FIELDS_BY_NAME: Dict[str, Dict[str, Any]] = {field["name"]: field for field in EXTRACTION_FIELDS}
+
+
+def _describe_fields(fields: List[Dict[str, Any]]) -> str:
+    """Render the "Fields to extract" list for a prompt."""
+    return "\n".join(
         f"- {field['name']}: {field['description']} (type: {field['type']})"
-        for field in EXTRACTION_FIELDS
-    ])
-    
-    prompt = f"""You are an expert at extracting structured information from business documents.
+        for field in fields
+    )
+
+
+# Field list for the prompt, rendered once at import
+_FIELDS_DESCRIPTION = _describe_fields(EXTRACTION_FIELDS)
+
+# Everything in the prompt except the document text is constant, so the text
+# before and after it is built once here
+_PROMPT_INTRO = """You are an expert at extracting structured information from business documents.
 
 Your task is to extract company information from the following document text and return it as structured JSON.
 
 Fields to extract:
-{fields_description}
+"""
+
+_PROMPT_INSTRUCTIONS = """
 
 Instructions:
 1. Read through the document text carefully
@@ -123,30 +128,100 @@ Instructions:
 7. Normalize values (e.g., dates to YYYY-MM-DD format, phone numbers to consistent format)
 
 Document text:
-{document_text}
+"""
+
+_PROMPT_PREFIX = _PROMPT_INTRO + _FIELDS_DESCRIPTION + _PROMPT_INSTRUCTIONS
+
+_PROMPT_SUFFIX = """
 
 Return your response as a JSON object with this structure:
-{{
+{
   "fields": [
-    {{
+    {
       "field_name": "company_name",
       "value": "Acme Corporation",
       "confidence": 0.95,
-      "source_span": {{
+      "source_span": {
         "start": 0,
         "end": 16,
         "text": "Acme Corporation"
-      }},
+      },
       "field_type": "text",
       "notes": "Found in document header"
-    }}
+    }
   ],
   "extraction_method": "llm"
-}}
+}
 
 Important: Return ONLY valid JSON. Do not include any explanatory text before or after the JSON."""
+
+
+@functools.lru_cache(maxsize=32)
+def _prompt_prefix(field_names: Tuple[str, ...]) -> str:
+    """
+    Build (once per field selection) the prompt text before the document.
     
-    return prompt
+    Args:
+        field_names: Names of the fields to request, in order
+        
+    Returns:
+        Prompt prefix listing only those fields
+        
+    Raises:
+        ValueError: If a field name is not in EXTRACTION_FIELDS
+    """
+    unknown = [name for name in field_names if name not in _FIELDS_BY_NAME]
+    if unknown:
+        raise ValueError(f"Unknown extraction fields: {', '.join(unknown)}")
+    
+    fields = [_FIELDS_BY_NAME[name] for name in field_names]
+    return _PROMPT_INTRO + _describe_fields(fields) + _PROMPT_INSTRUCTIONS
+
+
+def build_extraction_prompt_parts(
+    document_text: str,
+    fields: Optional[List[str]] = None
+) -> Tuple[str, str]:
+    """
+    Build the extraction prompt as a shared prefix and a per-document part.
+    
+    The prefix is the same string object on every call for a given field
+    selection, so it can be sent as a separate block and marked for prompt
+    caching (e.g. Anthropic's ``cache_control: {"type": "ephemeral"}``).
+    
+    Args:
+        document_text: The parsed text from the document
+        fields: Names of the fields to extract (defaults to all EXTRACTION_FIELDS)
+        
+    Returns:
+        Tuple of (prefix, document text followed by the response instructions)
+        
+    Raises:
+        ValueError: If a field name is not in EXTRACTION_FIELDS
+    """
+    prefix = _PROMPT_PREFIX if fields is None else _prompt_prefix(tuple(fields))
+    return prefix, document_text + _PROMPT_SUFFIX
+
+
+def build_extraction_prompt(document_text: str, fields: Optional[List[str]] = None) -> str:
+    """
+    Build the prompt for LLM field extraction.
+    
+    All requested fields go into one prompt with a single JSON response
+    schema, so one LLM call extracts every field.
+    
+    Args:
+        document_text: The parsed text from the document
+        fields: Names of the fields to extract (defaults to all EXTRACTION_FIELDS)
+        
+    Returns:
+        Formatted prompt string
+        
+    Raises:
+        ValueError: If a field name is not in EXTRACTION_FIELDS
+    """
+    prefix, document_part = build_extraction_prompt_parts(document_text, fields)
+    return prefix + document_part
 
 
 def get_field_definitions() -> list[Dict[str, Any]]:
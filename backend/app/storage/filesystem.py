@@ -4,11 +4,36 @@ Local filesystem storage abstraction.
 This module provides a clean interface for file operations,
 allowing easy migration to cloud storage in the future.
 """
+import asyncio
 import os
+import shutil
+from dataclasses import dataclass
 from pathlib import Path
-from typing import Optional, BinaryIO
+from typing import Iterable, Optional, BinaryIO, Union
 from app.core.config import settings
 
+# Chunk size for streaming copies from file-like objects
+COPY_CHUNK_SIZE = 1024 * 1024
+
+
+@dataclass(frozen=True, slots=True)
+class SaveResult:
+    """
+    Full path of a saved file, with the size and inode fstat() reported for it.
+    
+    The stat fields save callers a second stat() call on the path.
+    """
+    path: str
+    st_size: int
+    st_ino: int
+    
+    @classmethod
+    def from_file(cls, path: Path, f: BinaryIO) -> "SaveResult":
+        """Flush an open file and build the result from its descriptor."""
+        f.flush()
+        st = os.fstat(f.fileno())
+        return cls(str(path), st.st_size, st.st_ino)
+
 
 class FileStorage:
     """
@@ -28,24 +53,117 @@ class FileStorage:
         self.base_path = Path(base_path or settings.UPLOAD_DIR)
         self.base_path.mkdir(parents=True, exist_ok=True)
     
-    def save(self, file_content: bytes, file_path: str) -> str:
+    def save(self, file_content: Union[bytes, BinaryIO], file_path: str) -> SaveResult:
         """
         Save file content to storage.
         
+        File-like objects are copied in chunks from their current position,
+        so large uploads never need to be held in memory as one bytes object.
+        
         Args:
-            file_content: Binary file content
+            file_content: Binary file content or a readable binary file object
             file_path: Relative path within storage directory
             
         Returns:
-            str: Full path to saved file
+            SaveResult: Full path to saved file (.path), with its size and inode
         """
         full_path = self.base_path / file_path
         full_path.parent.mkdir(parents=True, exist_ok=True)
         
         with open(full_path, "wb") as f:
-            f.write(file_content)
+            if isinstance(file_content, (bytes, bytearray, memoryview)):
+                # Write straight to the descriptor from memoryview slices, which
+                # reference the content rather than copy it; os.write may write
+                # less than asked, so advance by what it reports
+                view = memoryview(file_content).cast("B")
+                fd = f.fileno()
+                offset = 0
+                while offset < len(view):
+                    offset += os.write(fd, view[offset:offset + COPY_CHUNK_SIZE])
+            else:
+                shutil.copyfileobj(file_content, f, length=COPY_CHUNK_SIZE)
+            result = SaveResult.from_file(full_path, f)
+        
+        return result
+    
+    def save_stream(self, chunks: Iterable[bytes], file_path: str) -> SaveResult:
+        """
+        Save content that arrives as an iterable of byte chunks.
+        
+        Each chunk is written as it is produced, so memory use is bounded by
+        the chunk size rather than the file size.
+        
+        Args:
+            chunks: Iterable of binary chunks (e.g. a generator over a request body)
+            file_path: Relative path within storage directory
+            
+        Returns:
+            SaveResult: Full path to saved file (.path), with its size and inode
+        """
+        full_path = self.base_path / file_path
+        full_path.parent.mkdir(parents=True, exist_ok=True)
+        
+        with open(full_path, "wb") as f:
+            for chunk in chunks:
+                f.write(chunk)
+            result = SaveResult.from_file(full_path, f)
+        
+        return result
+    
+    def save_path(self, src_path: Union[str, Path], file_path: str) -> SaveResult:
+        """
+        Save a copy of a file that is already on disk.
+        
+        Uses os.sendfile where available, so the bytes are copied inside the
+        kernel instead of passing through Python buffers.
+        
+        Args:
+            src_path: Path of the file to copy
+            file_path: Relative path within storage directory
+            
+        Returns:
+            SaveResult: Full path to saved file (.path), with its size and inode
+            
+        Raises:
+            FileNotFoundError: If src_path doesn't exist
+        """
+        full_path = self.base_path / file_path
+        full_path.parent.mkdir(parents=True, exist_ok=True)
+        
+        if hasattr(os, "sendfile"):
+            with open(src_path, "rb") as src, open(full_path, "wb") as dst:
+                src_fd, dst_fd = src.fileno(), dst.fileno()
+                remaining = os.fstat(src_fd).st_size
+                offset = 0
+                while remaining > 0:
+                    sent = os.sendfile(dst_fd, src_fd, offset, min(remaining, COPY_CHUNK_SIZE))
+                    if sent == 0:
+                        break
+                    offset += sent
+                    remaining -= sent
+                result = SaveResult.from_file(full_path, dst)
+        else:
+            shutil.copyfile(src_path, full_path)
+            st = os.stat(full_path)
+            result = SaveResult(str(full_path), st.st_size, st.st_ino)
         
-        return str(full_path)
+        return result
+    
+    async def save_async(self, file_content: Union[bytes, BinaryIO], file_path: str) -> SaveResult:
+        """
+        Save file content to storage without blocking the event loop.
+        
+        Runs save() in a worker thread, so independent saves awaited
+        together (e.g. with asyncio.gather) overlap their disk I/O.
+        
+        Args:
+            file_content: Binary file content or a readable binary file object
+            file_path: Relative path within storage directory
+            
+        Returns:
+            SaveResult: Full path to saved file (.path), with its size and inode
+        """
+        return await asyncio.to_thread(self.save, file_content, file_path)
     
     def read(self, file_path: str) -> bytes:
         """
@@ -60,13 +178,57 @@ class FileStorage:
         Raises:
             FileNotFoundError: If file doesn't exist
         """
-        full_path = self.base_path / file_path
-        if not full_path.exists():
-            raise FileNotFoundError(f"File not found: {file_path}")
-        
-        with open(full_path, "rb") as f:
+        # read() with no size allocates once from fstat's st_size and reads
+        # the whole file in as few syscalls as the kernel allows
+        with self._open_sequential(file_path) as f:
             return f.read()
     
+    def read_stream(self, file_path: str) -> BinaryIO:
+        """
+        Open a stored file for streaming reads.
+        
+        The caller is responsible for closing the returned file object.
+        
+        Args:
+            file_path: Relative path within storage directory
+            
+        Returns:
+            BinaryIO: File object opened in binary read mode
+            
+        Raises:
+            FileNotFoundError: If file doesn't exist
+        """
+        return self._open_sequential(file_path)
+    
+    def _open_sequential(self, file_path: str) -> BinaryIO:
+        """
+        Open a stored file for a front-to-back read.
+        
+        Tells the kernel the access is sequential (where posix_fadvise is
+        available) so it reads ahead aggressively on large PDFs.
+        
+        Args:
+            file_path: Relative path within storage directory
+            
+        Returns:
+            BinaryIO: File object opened in binary read mode
+            
+        Raises:
+            FileNotFoundError: If file doesn't exist
+        """
+        try:
+            f = open(self.base_path / file_path, "rb")
+        except FileNotFoundError:
+            raise FileNotFoundError(f"File not found: {file_path}") from None
+        
+        if hasattr(os, "posix_fadvise"):
+            try:
+                os.posix_fadvise(f.fileno(), 0, 0, os.POSIX_FADV_SEQUENTIAL)
+            except OSError:
+                # Advisory only; some filesystems don't support it
+                pass
+        return f
+    
     def delete(self, file_path: str) -> bool:
         """
         Delete file from storage.
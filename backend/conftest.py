@@ -0,0 +1,79 @@
+"""
+Shared setup for the backend test scripts.
+
+Running a script directly puts this directory on sys.path already; under
+pytest this file does it once for every test module. The ``db`` fixture
+lets pytest (and pytest-xdist, e.g. ``pytest -n auto test_upload_simple.py``)
+run the tests that take a session; with the default in-memory database
+each worker process gets its own.
+
+The scripts also import use_fast_pragmas from here when run directly, so
+pytest itself is optional.
+"""
+import os
+import sys
+from pathlib import Path
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+try:
+    import pytest
+    PYTEST_AVAILABLE = True
+except ImportError:
+    PYTEST_AVAILABLE = False
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+# Set before any test module imports app.db.database, which builds the engine
+os.environ.setdefault("DATABASE_URL", "sqlite:///:memory:")
+
+
+def _set_fast_pragmas(dbapi_connection, connection_record):
+    """Trade durability for speed on the throwaway test database."""
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA synchronous=OFF")
+    cursor.execute("PRAGMA journal_mode=MEMORY")
+    cursor.execute("PRAGMA temp_store=MEMORY")
+    cursor.close()
+
+
+def use_fast_pragmas(engine: Engine) -> None:
+    """
+    Tune every new connection of a test engine with _set_fast_pragmas.
+    
+    Call before the engine's first connection (e.g. before create_all);
+    connections that already exist are not changed.
+    """
+    if not event.contains(engine, "connect", _set_fast_pragmas):
+        event.listen(engine, "connect", _set_fast_pragmas)
+
+
+# The fixtures are pytest-only; scripts run directly don't need them
+if PYTEST_AVAILABLE:
+    @pytest.fixture(scope="session", autouse=True)
+    def _schema():
+        """Create the tables once per pytest run; drop them and the pool at the end."""
+        # Imported here so the test modules' DATABASE_URL is in place first
+        from app.db.database import Base, engine
+        
+        use_fast_pragmas(engine)
+        Base.metadata.create_all(bind=engine)
+        yield
+        Base.metadata.drop_all(bind=engine)
+        engine.dispose()
+    
+    @pytest.fixture(scope="module")
+    def _db_session():
+        """One session per test module."""
+        from app.db.database import SessionLocal
+        
+        session = SessionLocal()
+        yield session
+        session.close()
+    
+    @pytest.fixture
+    def db(_db_session):
+        """Database session for tests that take one; commits what the test leaves open."""
+        yield _db_session
+        _db_session.commit()
@@ -1,18 +1,30 @@
 """
 FastAPI application entry point for AI Paperwork Co-pilot backend.
 """
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from app.api.v1 import health, documents, facts, autofill, unified_workflow
 from app.core.logging_config import setup_logging
+from app.services.pdf_form_detector import shutdown_detection_pool
 
 # Setup logging
 setup_logging()
 
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Release process-wide resources when the server shuts down."""
+    yield
+    shutdown_detection_pool()
+
+
 app = FastAPI(
     title="AI Paperwork Co-pilot API",
     description="Backend API for AI-powered paperwork assistance",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # Configure CORS
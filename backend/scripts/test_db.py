@@ -41,7 +41,9 @@ def test_database():
     print("\nTesting model creation...")
     db = SessionLocal()
     try:
-        # Create a test document
+        # Build the whole object graph first and insert it in one
+        # transaction. Foreign keys are wired through relationships, so
+        # the unit of work orders the inserts and fills in the IDs.
         test_doc = Document(
             filename="test_document.pdf",
             file_path="./uploads/test_document.pdf",
@@ -50,43 +52,28 @@ def test_database():
             mime_type="application/pdf",
             processed="completed"
         )
-        db.add(test_doc)
-        db.commit()
-        db.refresh(test_doc)
-        print(f"✓ Created test document (ID: {test_doc.id})")
         
-        # Create a test extracted field
         test_field = ExtractedField(
-            document_id=test_doc.id,
+            document=test_doc,
             field_name="company_name",
             field_type="text",
             value="Test Company Inc.",
             confidence=0.95,
             extraction_method="ai_model"
         )
-        db.add(test_field)
-        db.commit()
-        db.refresh(test_field)
-        print(f"✓ Created test extracted field (ID: {test_field.id})")
         
-        # Create a test company fact
         test_fact = CompanyFact(
             fact_key="company_name",
             fact_category="company_info",
             fact_value="Test Company Inc.",
             confidence=0.95,
-            source_document_id=test_doc.id,
-            source_field_id=test_field.id,
+            source_document=test_doc,
+            source_field=test_field,
             last_edited_by="system"
         )
-        db.add(test_fact)
-        db.commit()
-        db.refresh(test_fact)
-        print(f"✓ Created test company fact (ID: {test_fact.id})")
         
-        # Create a test history entry
         test_history = FactHistory(
-            fact_id=test_fact.id,
+            fact=test_fact,
             change_type=ChangeType.EXTRACTION,
             changed_by="system",
             old_value=None,
@@ -94,9 +81,12 @@ def test_database():
             new_confidence="0.95",
             reason="Initial extraction from document"
         )
-        db.add(test_history)
+        
+        db.add_all([test_doc, test_field, test_fact, test_history])
         db.commit()
-        db.refresh(test_history)
+        print(f"✓ Created test document (ID: {test_doc.id})")
+        print(f"✓ Created test extracted field (ID: {test_field.id})")
+        print(f"✓ Created test company fact (ID: {test_fact.id})")
         print(f"✓ Created test history entry (ID: {test_history.id})")
         
         # Test relationships
@@ -0,0 +1,297 @@
+#!/usr/bin/env python3
+"""
+Test script for PDF form auto-fill.
+Tests: filling forms whose /AcroForm is stored inline or as an indirect object,
+caching and invalidation of auto-fill results, batch form field detection,
+and slicing of detected form fields.
+"""
+import sys
+import os
+import io
+import asyncio
+
+# Use in-memory SQLite for testing
+os.environ["DATABASE_URL"] = "sqlite:///:memory:"
+
+from PyPDF2 import PdfReader
+
+from fastapi import HTTPException, UploadFile
+
+from app.api.v1.autofill import detect_form_fields_batch
+from app.api.v1.documents import delete_document
+from app.db.database import engine, Base, SessionLocal
+from app.models import CompanyFact, Document
+from app.services.memory_graph import MemoryGraphService
+from app.services.pdf_autofill import PDFAutoFillService, _FieldFill, invalidate_autofill_cache
+from app.services.pdf_form_detector import PDFFormDetector, PDFFormFields, shutdown_detection_pool
+from app.storage.filesystem import storage
+
+def setup_test_db():
+    """Initialize test database."""
+    print("Setting up test database...")
+    Base.metadata.create_all(bind=engine)
+    print("✓ Test database initialized\n")
+
+def make_form_pdf(field_name: str = "company_name", inline_acroform: bool = False) -> bytes:
+    """Build a one-page PDF with a single text field, its /AcroForm inline or indirect."""
+    acro_form = "<< /Fields [4 0 R] >>"
+    objects = [
+        f"<< /Type /Catalog /Pages 2 0 R /AcroForm {acro_form if inline_acroform else '5 0 R'} >>",
+        "<< /Type /Pages /Kids [3 0 R] /Count 1 >>",
+        "<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] /Annots [4 0 R] >>",
+        f"<< /Type /Annot /Subtype /Widget /FT /Tx /T ({field_name}) /V () /Rect [50 700 300 720] /P 3 0 R >>",
+    ]
+    if not inline_acroform:
+        objects.append(acro_form)
+    
+    pdf = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(pdf))
+        pdf += f"{number} 0 obj\n{body}\nendobj\n".encode()
+    xref = len(pdf)
+    pdf += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode()
+    for offset in offsets:
+        pdf += f"{offset:010d} 00000 n \n".encode()
+    pdf += f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode()
+    return bytes(pdf)
+
+def test_fill_acroform():
+    """Test that forms with inline and indirect /AcroForm dictionaries are filled."""
+    print("=" * 60)
+    print("TEST 1: Fill Inline and Indirect AcroForms")
+    print("=" * 60)
+    
+    explanations = [_FieldFill(
+        field_name="company_name",
+        fact_key="company_name",
+        value="Acme Corporation",
+        confidence=0.95,
+        reason="Test value",
+        matched=True
+    )]
+    
+    for inline_acroform in (True, False):
+        label = "inline" if inline_acroform else "indirect"
+        pdf_content = make_form_pdf(inline_acroform=inline_acroform)
+        
+        file_path = PDFAutoFillService._generate_filled_pdf(pdf_content, explanations)
+        assert file_path is not None, f"Filled PDF should be generated for an {label} AcroForm"
+        try:
+            filled = PdfReader(io.BytesIO(storage.read(file_path)))
+            values = filled.get_form_text_fields()
+            assert values == {"company_name": "Acme Corporation"}, f"Unexpected {label} form values: {values}"
+        finally:
+            storage.delete(file_path)
+        print(f"✓ {label.capitalize()} AcroForm filled: {values}")
+    
+    print()
+
+def test_failed_preview_not_cached():
+    """Test that a result whose preview failed is recomputed, not served from the cache."""
+    print("=" * 60)
+    print("TEST 2: Failed Previews Are Not Cached")
+    print("=" * 60)
+    
+    pdf_content = make_form_pdf(field_name="cache_test_field")
+    generate_filled_pdf = PDFAutoFillService._generate_filled_pdf
+    db = SessionLocal()
+    try:
+        # Simulate a preview failure (e.g. disk full)
+        PDFAutoFillService._generate_filled_pdf = staticmethod(lambda *args, **kwargs: None)
+        try:
+            failed = PDFAutoFillService.autofill_pdf(pdf_content, db)
+        finally:
+            PDFAutoFillService._generate_filled_pdf = generate_filled_pdf
+        assert failed.filled_pdf_path is None, "Preview should have failed"
+        print("✓ First request produced no preview")
+        
+        retried = PDFAutoFillService.autofill_pdf(pdf_content, db)
+        assert retried.filled_pdf_path is not None, "Failed result should not come from the cache"
+        print(f"✓ Retry generated preview: {retried.filled_pdf_path}")
+        
+        cached = PDFAutoFillService.autofill_pdf(pdf_content, db)
+        assert cached == retried, "Successful result should be cached"
+        assert cached is not retried, "Cache should hand out copies"
+        print("✓ Successful result served from the cache")
+        
+        cached.explanations.clear()
+        assert PDFAutoFillService.autofill_pdf(pdf_content, db) == retried, "Mutating a result should not touch the cache"
+        print("✓ Cached result is not shared with callers")
+        
+        storage.delete(retried.filled_pdf_path)
+        regenerated = PDFAutoFillService.autofill_pdf(pdf_content, db)
+        assert regenerated.filled_pdf_path != retried.filled_pdf_path, "Deleted preview should invalidate the cache"
+        storage.delete(regenerated.filled_pdf_path)
+        print("✓ Deleted preview invalidates the cached result\n")
+    finally:
+        db.close()
+
+def test_cache_invalidated_by_writes():
+    """Test that fact edits and document deletion drop cached results."""
+    print("=" * 60)
+    print("TEST 3: Cache Invalidation")
+    print("=" * 60)
+    
+    pdf_content = make_form_pdf(field_name="company_name")
+    db = SessionLocal()
+    try:
+        document = Document(filename="source.pdf", file_path="missing/source.pdf", file_type="pdf", file_size=1)
+        db.add(document)
+        db.flush()
+        db.add(CompanyFact(
+            fact_key="company_name",
+            fact_value="Acme Corporation",
+            confidence=0.9,
+            source_document_id=document.id,
+            status="active"
+        ))
+        db.commit()
+        invalidate_autofill_cache()
+        
+        def company_name():
+            result = PDFAutoFillService.autofill_pdf(pdf_content, db, generate_preview=False)
+            explanation = result.explanations[0]
+            return explanation.value, explanation.source_document_name
+        
+        assert company_name() == ("Acme Corporation", "source.pdf"), "Fact should fill the field"
+        
+        MemoryGraphService.update_fact_from_user_edit("company_name", "Acme Corp", "tester", None, db)
+        assert company_name()[0] == "Acme Corp", "User edit should invalidate the cache"
+        print("✓ User edit invalidates cached results")
+        
+        asyncio.run(delete_document(document.id, db))
+        assert company_name()[1] is None, "Deleting the source document should invalidate the cache"
+        print("✓ Document deletion invalidates cached results\n")
+    finally:
+        # Leave no fact behind for tests sharing the database (e.g. under pytest)
+        db.rollback()
+        for fact in db.query(CompanyFact).filter(CompanyFact.fact_key == "company_name"):
+            db.delete(fact)  # cascades to its history
+        db.commit()
+        invalidate_autofill_cache()
+        db.close()
+
+def test_detect_fields_batch():
+    """Test batch detection inline (one PDF) and on the process pool (several)."""
+    print("=" * 60)
+    print("TEST 4: Batch Field Detection")
+    print("=" * 60)
+    
+    names = ["company_name", "ein", "phone"]
+    pdfs = [make_form_pdf(field_name=name) for name in names]
+    
+    results = PDFFormDetector.detect_form_fields_batch(pdfs)
+    assert [fields.names for fields in results] == [[name] for name in names], "Fields should match, in input order"
+    print(f"✓ {len(pdfs)} PDFs detected on the process pool")
+    
+    results = asyncio.run(PDFFormDetector.detect_form_fields_batch_async(pdfs))
+    assert [fields.names for fields in results] == [[name] for name in names], "Async fields should match, in input order"
+    print(f"✓ {len(pdfs)} PDFs detected on the process pool (async)")
+    
+    results = asyncio.run(PDFFormDetector.detect_form_fields_batch_async(pdfs[:1]))
+    assert [fields.names for fields in results] == [["company_name"]], "Single PDF should be detected inline"
+    print("✓ Single PDF detected inline\n")
+
+def test_detect_fields_batch_endpoint():
+    """Test the /detect-fields/batch handler with one, several and invalid uploads."""
+    print("=" * 60)
+    print("TEST 5: Batch Field Detection Endpoint")
+    print("=" * 60)
+    
+    def uploads(*names):
+        return [
+            UploadFile(file=io.BytesIO(make_form_pdf(field_name=name)), filename=f"{name}.pdf")
+            for name in names
+        ]
+    
+    response = asyncio.run(detect_form_fields_batch(uploads("company_name")))
+    assert [doc["fields"][0]["name"] for doc in response["documents"]] == ["company_name"], "Single upload should be detected"
+    print("✓ Single upload detected")
+    
+    response = asyncio.run(detect_form_fields_batch(uploads("company_name", "ein")))
+    assert [doc["filename"] for doc in response["documents"]] == ["company_name.pdf", "ein.pdf"], "Should keep upload order"
+    assert [doc["fields"][0]["name"] for doc in response["documents"]] == ["company_name", "ein"], "Fields should match"
+    print("✓ Several uploads detected in upload order")
+    
+    invalid = uploads("company_name") + [UploadFile(file=io.BytesIO(b"not a pdf"), filename="notes.txt")]
+    try:
+        asyncio.run(detect_form_fields_batch(invalid))
+        raise AssertionError("Non-PDF upload should be rejected")
+    except HTTPException as e:
+        assert e.status_code == 400, f"Expected 400, got {e.status_code}"
+        assert "notes.txt" in e.detail, "Error should name the rejected file"
+    print("✓ Non-PDF upload rejected\n")
+
+def test_form_fields_slicing():
+    """Test that PDFFormFields indexes and slices like a list of PDFFormField."""
+    print("=" * 60)
+    print("TEST 6: Form Field Slicing")
+    print("=" * 60)
+    
+    fields = PDFFormFields()
+    for i, name in enumerate(["company_name", "ein", "phone", "email"]):
+        fields.append(field_name=name, field_type="text", value=f"value_{i}", page_number=i // 2)
+    
+    def as_tuples(records):
+        return [(r.field_name, r.field_type, r.value, r.page_number) for r in records]
+    
+    records = as_tuples(fields)
+    assert as_tuples([fields[1], fields[-1]]) == [records[1], records[-1]], "Indexing should return records"
+    for index in (slice(None, 2), slice(1, 3), slice(None, None, -2), slice(5, 9)):
+        sliced = fields[index]
+        assert isinstance(sliced, PDFFormFields), "A slice should be a PDFFormFields"
+        assert as_tuples(sliced) == records[index], f"Slice {index} should match the list slice"
+    fields[:2].append(field_name="website", field_type="text")
+    assert len(fields) == 4, "A slice should not share columns with the original"
+    print("✓ Indexing and slicing match a list of PDFFormField\n")
+
+def main():
+    """Run all tests."""
+    print("\n" + "=" * 60)
+    print("PDF Auto-Fill Tests")
+    print("=" * 60 + "\n")
+    
+    setup_test_db()
+    
+    try:
+        # Test 1: AcroForm filling
+        test_fill_acroform()
+        
+        # Test 2: Result caching
+        test_failed_preview_not_cached()
+        
+        # Test 3: Cache invalidation
+        test_cache_invalidated_by_writes()
+        
+        # Test 4: Batch detection
+        test_detect_fields_batch()
+        
+        # Test 5: Batch detection endpoint
+        test_detect_fields_batch_endpoint()
+        
+        # Test 6: Form field slicing
+        test_form_fields_slicing()
+        
+        print("=" * 60)
+        print("✓ ALL TESTS PASSED!")
+        print("=" * 60)
+        print("\nSummary:")
+        print("  ✓ Inline and indirect AcroForms are filled")
+        print("  ✓ Failed previews are retried instead of cached")
+        print("  ✓ Fact edits and document deletion invalidate cached results")
+        print("  ✓ Batch detection works inline and on the process pool")
+        print("  ✓ Form fields slice like a list")
+        
+        return 0
+    
+    except Exception as e:
+        print(f"\n✗ Test failed with error: {e}")
+        import traceback
+        traceback.print_exc()
+        return 1
+    finally:
+        shutdown_detection_pool()
+
+if __name__ == "__main__":
+    sys.exit(main())
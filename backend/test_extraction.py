@@ -2,22 +2,15 @@
 """
 Test script for LLM field extraction service.
 """
+import json
 import sys
-from pathlib import Path
 
-sys.path.insert(0, str(Path(__file__).parent))
-
-from app.services.llm_extractor import LLMExtractor
-from app.services.prompts import build_extraction_prompt
+from app.services.llm_extractor import DETERMINISTIC_CONFIDENCE, LLMExtractor
+from app.services.prompts import build_extraction_prompt, build_extraction_prompt_parts, get_field_definitions
 from app.schemas.extraction import ExtractionResult
 
-def test_prompt_generation():
-    """Test prompt template generation."""
-    print("=" * 60)
-    print("TEST 1: Prompt Template Generation")
-    print("=" * 60)
-    
-    sample_text = """
+# Sample document text shared by the tests
+SAMPLE_TEXT_MIN = """
     ACME CORPORATION
     123 Business Street
     New York, NY 10001
@@ -29,21 +22,8 @@ def test_prompt_generation():
     Incorporated: January 15, 2020
     State of Incorporation: Delaware
     """
-    
-    prompt = build_extraction_prompt(sample_text)
-    print(f"✓ Prompt generated ({len(prompt)} characters)")
-    print(f"✓ Prompt includes field definitions")
-    print(f"✓ Prompt includes document text\n")
-    
-    return True
 
-def test_llm_extraction():
-    """Test LLM extraction with sample text."""
-    print("=" * 60)
-    print("TEST 2: LLM Field Extraction")
-    print("=" * 60)
-    
-    sample_text = """
+SAMPLE_TEXT_FULL = """
     ACME CORPORATION
     123 Business Street, Suite 100
     New York, NY 10001
@@ -56,17 +36,98 @@ def test_llm_extraction():
     Date of Incorporation: January 15, 2020
     State of Incorporation: Delaware
     """
+
+def test_prompt_generation():
+    """Test prompt template generation."""
+    print("=" * 60)
+    print("TEST 1: Prompt Template Generation")
+    print("=" * 60)
+    
+    prompt = build_extraction_prompt(SAMPLE_TEXT_MIN)
+    print(f"✓ Prompt generated ({len(prompt)} characters)")
+    
+    # Every field goes into one prompt with one JSON response schema
+    for field in get_field_definitions():
+        assert f"- {field['name']}:" in prompt, f"Prompt should include {field['name']}"
+    print(f"✓ Prompt includes field definitions")
+    assert prompt.count("Return your response as a JSON object") == 1, "Prompt should have one JSON directive"
+    print(f"✓ Prompt includes a single JSON response schema")
+    assert SAMPLE_TEXT_MIN in prompt, "Prompt should include document text"
+    print(f"✓ Prompt includes document text")
+    
+    # A field subset only lists the requested fields
+    subset_prompt = build_extraction_prompt(SAMPLE_TEXT_MIN, ["ein", "phone"])
+    assert "- ein:" in subset_prompt and "- phone:" in subset_prompt
+    assert "- company_name:" not in subset_prompt
+    print(f"✓ Prompt can request a subset of fields")
+    
+    # The field-schema prefix is built once and reused, so it can be cached
+    prefix, document_part = build_extraction_prompt_parts(SAMPLE_TEXT_MIN)
+    assert prefix + document_part == prompt, "Prompt parts should join to the full prompt"
+    assert build_extraction_prompt_parts("Other text")[0] is prefix, "Prefix should be reused across calls"
+    print(f"✓ Prompt prefix is shared across documents\n")
+    
+    return True
+
+def test_llm_extraction():
+    """Test LLM extraction with sample text."""
+    print("=" * 60)
+    print("TEST 2: LLM Field Extraction")
+    print("=" * 60)
     
     try:
-        result = LLMExtractor.extract_fields(sample_text)
+        field_names = [field['name'] for field in get_field_definitions()]
+        
+        # One call extracts every field
+        result = LLMExtractor.extract_all(field_names, SAMPLE_TEXT_FULL)
         
         print(f"✓ Extraction successful")
-        print(f"✓ Extraction method: {result.extraction_method}")
-        print(f"✓ Fields extracted: {len(result.fields)}")
+        assert set(result) <= set(field_names), "Only requested fields should be returned"
+        for field_name, field in result.items():
+            assert field.field_name == field_name, "Results should be keyed by field name"
+        print(f"✓ Fields extracted: {len(result)}")
+        
+        # The stub LLM doesn't return fixed-format fields, so they fall back
+        # to pattern matches
+        expected = {
+            "ein": "12-3456789",
+            "phone": "(555) 123-4567",
+            "email": "contact@acme.com",
+            "website": "https://www.acme.com",
+        }
+        for field_name, value in expected.items():
+            assert field_name in result, f"{field_name} should be extracted"
+            assert result[field_name].value == value, f"Expected {value}, got {result[field_name].value}"
+            span = result[field_name].source_span
+            assert SAMPLE_TEXT_FULL[span.start:span.end] == value, "Source span should point at the value"
+            assert result[field_name].confidence == DETERMINISTIC_CONFIDENCE, "Pattern fallback should have low confidence"
+        print(f"✓ Pattern fields extracted: {', '.join(expected)}")
+        
+        # A field the LLM returns wins over the first pattern match (here a fax number)
+        text = "ACME CORPORATION\nFax: (555) 000-1111\nPhone: (555) 123-4567\n"
+        phone_start = text.index("(555) 123-4567")
+        llm_response = json.dumps({
+            "fields": [{
+                "field_name": "phone",
+                "value": "(555) 123-4567",
+                "confidence": 0.95,
+                "source_span": {"start": phone_start, "end": phone_start + 14, "text": "(555) 123-4567"},
+                "field_type": "text"
+            }],
+            "extraction_method": "llm"
+        })
+        stub_llm_call = LLMExtractor._stub_llm_call
+        LLMExtractor._stub_llm_call = staticmethod(lambda *args, **kwargs: llm_response)
+        try:
+            phone = LLMExtractor.extract_all(["phone"], text)["phone"]
+        finally:
+            LLMExtractor._stub_llm_call = stub_llm_call
+        assert (phone.value, phone.confidence) == ("(555) 123-4567", 0.95), f"LLM answer should win, got {phone.value}"
+        print("✓ LLM answers override pattern matches")
         
-        if result.fields:
+        if result:
             print("\nExtracted fields:")
-            for field in result.fields:
+            for field in result.values():
                 print(f"  - {field.field_name}: {field.value}")
                 print(f"    Confidence: {field.confidence:.2f}")
                 print(f"    Source span: '{field.source_span.text[:50]}...'")
@@ -5,33 +5,68 @@ Tests: history preservation and user edit override behavior.
 """
 import sys
 import os
-from pathlib import Path
+import io
+import contextlib
+import functools
+import tempfile
+import threading
 from datetime import datetime
 
-# Add backend to path
-sys.path.insert(0, str(Path(__file__).parent))
+# Use in-memory SQLite for testing
+os.environ["DATABASE_URL"] = "sqlite:///:memory:"
 
-# Use SQLite for testing
-os.environ["DATABASE_URL"] = "sqlite:///./test_memory_graph.db"
+from sqlalchemy import create_engine, event, exc, insert
+from sqlalchemy.orm import sessionmaker
 
+from conftest import use_fast_pragmas
 from app.db.database import engine, Base, SessionLocal
 from app.models import Document, ExtractedField, CompanyFact
 from app.models.fact_history import FactHistory, ChangeType
 from app.services.memory_graph import MemoryGraphService
 
+# Columns shared by every test document
+_PDF_KWARGS = dict(file_type="pdf", file_size=1024, mime_type="application/pdf")
+
+def buffered_output(test):
+    """Collect a test's printed lines and write them to stdout in one call."""
+    @functools.wraps(test)
+    def wrapper(*args, **kwargs):
+        buffer = io.StringIO()
+        try:
+            with contextlib.redirect_stdout(buffer):
+                return test(*args, **kwargs)
+        finally:
+            sys.stdout.write(buffer.getvalue())
+    return wrapper
+
 def setup_test_db():
     """Initialize test database."""
     print("Setting up test database...")
+    use_fast_pragmas(engine)
     Base.metadata.create_all(bind=engine)
     print("✓ Test database initialized\n")
 
 def cleanup_test_db():
-    """Clean up test database file."""
-    db_file = Path("test_memory_graph.db")
-    if db_file.exists():
-        db_file.unlink()
-        print("✓ Test database cleaned up")
+    """Clean up test database."""
+    Base.metadata.drop_all(bind=engine)
+    engine.dispose()
+    print("✓ Test database cleaned up")
+
+def insert_document(db, filename, file_path, fields):
+    """Insert a test document and bulk-insert its extracted fields; returns the document ID."""
+    document_id = db.execute(
+        insert(Document)
+        .values(filename=filename, file_path=file_path, **_PDF_KWARGS)
+        .returning(Document.id)
+    ).scalar_one()
+    db.bulk_insert_mappings(ExtractedField, [
+        {"document_id": document_id, "field_type": "text", "extraction_method": "llm", **field}
+        for field in fields
+    ])
+    db.commit()
+    return document_id
 
+@buffered_output
 def test_history_preservation():
     """Test that all changes create history entries."""
     print("=" * 60)
@@ -40,35 +75,14 @@ def test_history_preservation():
     
     db = SessionLocal()
     try:
-        # Create a test document
-        doc = Document(
-            filename="test_doc.pdf",
-            file_path="test.pdf",
-            file_type="pdf",
-            file_size=1024,
-            mime_type="application/pdf"
-        )
-        db.add(doc)
-        db.commit()
-        db.refresh(doc)
-        print(f"✓ Created test document (ID: {doc.id})")
-        
-        # Create extracted field
-        field1 = ExtractedField(
-            document_id=doc.id,
-            field_name="company_name",
-            field_type="text",
-            value="Acme Corp",
-            confidence=0.85,
-            extraction_method="llm"
-        )
-        db.add(field1)
-        db.commit()
-        db.refresh(field1)
-        print(f"✓ Created extracted field: {field1.value} (confidence: {field1.confidence})")
+        # Create a test document with one extracted field
+        field1 = {"field_name": "company_name", "value": "Acme Corp", "confidence": 0.85}
+        doc_id = insert_document(db, "test_doc.pdf", "test.pdf", [field1])
+        print(f"✓ Created test document (ID: {doc_id})")
+        print(f"✓ Created extracted field: {field1['value']} (confidence: {field1['confidence']})")
         
         # Process into memory graph (should create fact + history)
-        facts = MemoryGraphService.process_extracted_fields(doc.id, db)
+        facts = MemoryGraphService.process_extracted_fields(doc_id, db)
         assert len(facts) == 1, "Should create one fact"
         fact = facts[0]
         print(f"✓ Created fact: {fact.fact_key} = {fact.fact_value}")
@@ -84,26 +98,21 @@ def test_history_preservation():
         print(f"  - New value: {history[0].new_value}")
         print(f"  - Changed by: {history[0].changed_by}")
         
-        # Refresh fact to get current state
-        db.refresh(fact)
-        original_updated_at = fact.updated_at
-        
         # Create another extraction with different value and higher confidence
-        field2 = ExtractedField(
-            document_id=doc.id,
-            field_name="company_name",
-            field_type="text",
-            value="Acme Corporation",
-            confidence=0.96,  # Higher confidence (0.85 -> 0.96, diff = 0.11 > 0.1 threshold)
-            extraction_method="llm"
-        )
-        db.add(field2)
+        field2 = {
+            "document_id": doc_id,
+            "field_name": "company_name",
+            "field_type": "text",
+            "value": "Acme Corporation",
+            "confidence": 0.96,  # Higher confidence (0.85 -> 0.96, diff = 0.11 > 0.1 threshold)
+            "extraction_method": "llm"
+        }
+        db.bulk_insert_mappings(ExtractedField, [field2])
         db.commit()
-        db.refresh(field2)
         
         # Process again (should update fact + create history)
         # Note: This will process ALL fields for the document, picking best confidence for each field_name
-        facts2 = MemoryGraphService.process_extracted_fields(doc.id, db)
+        facts2 = MemoryGraphService.process_extracted_fields(doc_id, db)
         
         # Get the fact directly to verify it was updated
         fact2 = MemoryGraphService.get_fact("company_name", db)
@@ -114,8 +123,8 @@ def test_history_preservation():
         if fact2.fact_value != "Acme Corporation":
             print(f"  DEBUG: Fact value is {fact2.fact_value}, expected Acme Corporation")
             print(f"  DEBUG: Fact confidence is {fact2.confidence}")
-            print(f"  DEBUG: Field2 confidence is {field2.confidence}")
-            print(f"  DEBUG: Confidence diff: {field2.confidence - fact.confidence}")
+            print(f"  DEBUG: Field2 confidence is {field2['confidence']}")
+            print(f"  DEBUG: Confidence diff: {field2['confidence'] - fact.confidence}")
         
         assert fact2.fact_value == "Acme Corporation", f"Should update to higher confidence value, got {fact2.fact_value}"
         assert fact2.confidence == 0.96, f"Should have higher confidence, got {fact2.confidence}"
@@ -139,6 +148,7 @@ def test_history_preservation():
     finally:
         db.close()
 
+@buffered_output
 def test_user_edit_override():
     """Test that user edits override extractions cleanly."""
     print("=" * 60)
@@ -154,34 +164,17 @@ def test_user_edit_override():
             fact = existing_fact
             print(f"✓ Using existing fact: {fact.fact_value} (confidence: {fact.confidence})")
         else:
-            # Create a test document
-            doc = Document(
-                filename="test_doc2.pdf",
-                file_path="test2.pdf",
-                file_type="pdf",
-                file_size=1024,
-                mime_type="application/pdf"
-            )
-            db.add(doc)
-            db.commit()
-            db.refresh(doc)
-            
-            # Create extracted field
-            field = ExtractedField(
-                document_id=doc.id,
-                field_name="ein",  # Use different field to avoid conflicts
-                field_type="text",
-                value="12-3456789",
-                confidence=0.90,
-                extraction_method="llm"
-            )
-            db.add(field)
-            db.commit()
-            db.refresh(field)
-            print(f"✓ Created extracted field: {field.value} (confidence: {field.confidence})")
+            # Create a test document with one extracted field
+            field = {
+                "field_name": "ein",  # Use different field to avoid conflicts
+                "value": "12-3456789",
+                "confidence": 0.90
+            }
+            doc_id = insert_document(db, "test_doc2.pdf", "test2.pdf", [field])
+            print(f"✓ Created extracted field: {field['value']} (confidence: {field['confidence']})")
             
             # Process into memory graph
-            facts = MemoryGraphService.process_extracted_fields(doc.id, db)
+            facts = MemoryGraphService.process_extracted_fields(doc_id, db)
             if not facts:
                 # Fact might already exist, get it directly
                 fact = MemoryGraphService.get_fact("ein", db)
@@ -230,31 +223,15 @@ def test_user_edit_override():
         
         # Now try to overwrite with a new extraction (should be blocked)
         # Create a new document for the new extraction
-        doc2 = Document(
-            filename="test_doc3.pdf",
-            file_path="test3.pdf",
-            file_type="pdf",
-            file_size=1024,
-            mime_type="application/pdf"
-        )
-        db.add(doc2)
-        db.commit()
-        db.refresh(doc2)
-        
         conflicting_value = "Tech Solutions LLC" if fact_key == "company_name" else "11-2233445"
-        field2 = ExtractedField(
-            document_id=doc2.id,
-            field_name=fact_key,
-            field_type="text",
-            value=conflicting_value,  # Different value
-            confidence=0.99,  # Very high confidence
-            extraction_method="llm"
-        )
-        db.add(field2)
-        db.commit()
+        doc2_id = insert_document(db, "test_doc3.pdf", "test3.pdf", [{
+            "field_name": fact_key,
+            "value": conflicting_value,  # Different value
+            "confidence": 0.99  # Very high confidence
+        }])
         
         # Process again - should NOT update because user edited
-        MemoryGraphService.process_extracted_fields(doc2.id, db)
+        MemoryGraphService.process_extracted_fields(doc2_id, db)
         fact2 = MemoryGraphService.get_fact(fact_key, db)
         
         # Verify fact was NOT updated
@@ -273,9 +250,10 @@ def test_user_edit_override():
         
         # Verify the attempted update is in history
         attempted_updates = [h for h in history2 if h.new_value == conflicting_value]
-        if attempted_updates:
-            print(f"✓ Attempted update logged in history")
-            print(f"  - Reason: {attempted_updates[0].reason}")
+        assert len(attempted_updates) == 1, "Attempted update should be logged once"
+        assert attempted_updates[0].reason.endswith("preserving user value"), "Should explain the user edit lock"
+        print(f"✓ Attempted update logged in history")
+        print(f"  - Reason: {attempted_updates[0].reason}")
         
         print("\n✓ User edits successfully override and protect from extractions\n")
         
@@ -284,6 +262,7 @@ def test_user_edit_override():
     finally:
         db.close()
 
+@buffered_output
 def test_complete_flow():
     """Test complete flow: extraction → user edit → new extraction."""
     print("=" * 60)
@@ -292,31 +271,12 @@ def test_complete_flow():
     
     db = SessionLocal()
     try:
-        # Create document
-        doc = Document(
-            filename="flow_test.pdf",
-            file_path="flow.pdf",
-            file_type="pdf",
-            file_size=1024,
-            mime_type="application/pdf"
-        )
-        db.add(doc)
-        db.commit()
-        db.refresh(doc)
-        
         # Step 1: Initial extraction
-        field1 = ExtractedField(
-            document_id=doc.id,
-            field_name="ein",
-            field_type="text",
-            value="12-3456789",
-            confidence=0.88,
-            extraction_method="llm"
-        )
-        db.add(field1)
-        db.commit()
+        doc_id = insert_document(db, "flow_test.pdf", "flow.pdf", [
+            {"field_name": "ein", "value": "12-3456789", "confidence": 0.88}
+        ])
         
-        facts1 = MemoryGraphService.process_extracted_fields(doc.id, db)
+        facts1 = MemoryGraphService.process_extracted_fields(doc_id, db)
         fact = facts1[0]
         print(f"Step 1 - Initial extraction:")
         print(f"  Fact: {fact.fact_key} = {fact.fact_value} (confidence: {fact.confidence})")
@@ -336,38 +296,20 @@ def test_complete_flow():
         print(f"  History entries: {len(history_after_edit)}")
         
         # Step 3: New extraction with different value (should be blocked)
-        doc2 = Document(
-            filename="flow_test2.pdf",
-            file_path="flow2.pdf",
-            file_type="pdf",
-            file_size=1024,
-            mime_type="application/pdf"
-        )
-        db.add(doc2)
-        db.commit()
-        db.refresh(doc2)
-        
-        field2 = ExtractedField(
-            document_id=doc2.id,
-            field_name="ein",
-            field_type="text",
-            value="98-7654321",  # Different value
-            confidence=0.95,
-            extraction_method="llm"
-        )
-        db.add(field2)
-        db.commit()
+        doc2_id = insert_document(db, "flow_test2.pdf", "flow2.pdf", [
+            {"field_name": "ein", "value": "98-7654321", "confidence": 0.95}  # Different value
+        ])
         
-        MemoryGraphService.process_extracted_fields(doc2.id, db)
+        MemoryGraphService.process_extracted_fields(doc2_id, db)
         fact2 = MemoryGraphService.get_fact("ein", db)
+        assert MemoryGraphService.get_fact("ein", db) is fact2, "Repeat lookups should reuse the session's fact"
         print(f"\nStep 3 - New extraction (should be blocked):")
         print(f"  Fact preserved: {fact2.fact_value} (confidence: {fact2.confidence})")
         print(f"  Edit count unchanged: {fact2.edit_count}")
-        history_after_extraction = MemoryGraphService.get_fact_history(fact.id, db)
-        print(f"  History entries: {len(history_after_extraction)}")
+        history = MemoryGraphService.get_fact_history(fact.id, db)
+        print(f"  History entries: {len(history)}")
         
         # Verify complete history
-        history = MemoryGraphService.get_fact_history(fact.id, db)
         print(f"\n✓ Complete history ({len(history)} entries):")
         for i, h in enumerate(history, 1):
             print(f"  {i}. {h.change_type.value} - {h.old_value or 'null'} → {h.new_value}")
@@ -378,6 +320,84 @@ def test_complete_flow():
     finally:
         db.close()
 
+@buffered_output
+def test_process_many():
+    """Test processing several documents concurrently, including a fact-creation race."""
+    print("=" * 60)
+    print("TEST 4: Multi-Document Processing")
+    print("=" * 60)
+    
+    # The in-memory engine makes process_many run inline, so this test uses a
+    # file database where each session gets its own connection
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        file_engine = create_engine(f"sqlite:///{tmp_dir}/process_many.db")
+        Base.metadata.create_all(bind=file_engine)
+        FileSession = sessionmaker(autocommit=False, autoflush=False, bind=file_engine)
+        try:
+            run_process_many(file_engine, FileSession)
+        finally:
+            file_engine.dispose()
+
+def run_process_many(file_engine, FileSession):
+    """Race two documents to create the same fact and check the retry resolves it."""
+    db = FileSession()
+    try:
+        doc_ids = [
+            insert_document(db, "many_city.pdf", "many_city.pdf", [
+                {"field_name": "city", "value": "Chicago", "confidence": 0.8}
+            ]),
+            insert_document(db, "many_city2.pdf", "many_city2.pdf", [
+                {"field_name": "city", "value": "Chicago, IL", "confidence": 0.95}
+            ])
+        ]
+    finally:
+        db.close()
+    
+    # Hold both sessions just before they insert the new fact, so both have
+    # already seen it missing and one insert must hit the unique constraint
+    barrier = threading.Barrier(len(doc_ids), timeout=5)
+    flush_threads = set()
+    integrity_errors = []
+    
+    def insert_together(session, flush_context, instances):
+        if any(isinstance(obj, CompanyFact) for obj in session.new) and "raced" not in session.info:
+            session.info["raced"] = True
+            flush_threads.add(threading.get_ident())
+            barrier.wait()
+    
+    def record_error(context):
+        if isinstance(context.sqlalchemy_exception, exc.IntegrityError):
+            integrity_errors.append(context.sqlalchemy_exception)
+    
+    event.listen(FileSession, "before_flush", insert_together)
+    event.listen(file_engine, "handle_error", record_error)
+    results = MemoryGraphService.process_many(doc_ids, FileSession)
+    
+    assert set(results) == set(doc_ids), "Should return results for every document"
+    assert len(flush_threads) == 2 and threading.get_ident() not in flush_threads, "Documents should run in separate worker threads"
+    print(f"✓ {len(doc_ids)} documents processed in separate worker threads")
+    assert len(integrity_errors) == 1, f"Exactly one insert should lose the race, got {len(integrity_errors)}"
+    print("✓ Losing insert hit the unique constraint and was retried")
+    
+    db = FileSession()
+    try:
+        fact = MemoryGraphService.get_fact("city", db)
+        assert fact is not None, "Fact city should exist"
+        assert fact.fact_value == "Chicago, IL", f"Higher-confidence value should win, got {fact.fact_value}"
+        print(f"✓ Resolved fact: {fact.fact_key} = {fact.fact_value} (confidence: {fact.confidence})")
+        
+        # One query fetches the history of every processed fact
+        fact_ids = sorted({fact_id for ids in results.values() for fact_id in ids})
+        assert fact_ids == [fact.id], "Documents should only report the city fact"
+        histories = MemoryGraphService.get_fact_histories(fact_ids, db)
+        assert set(histories) == set(fact_ids), "Should return history for every fact"
+        assert histories[fact.id][-1].change_type == ChangeType.EXTRACTION, "Oldest entry should be the EXTRACTION"
+        print(f"✓ History loaded for {len(histories)} fact in one query ({len(histories[fact.id])} entries)")
+        
+        print("\n✓ Documents processed in separate sessions\n")
+    finally:
+        db.close()
+
 def main():
     """Run all tests."""
     print("\n" + "=" * 60)
@@ -396,6 +416,9 @@ def main():
         # Test 3: Complete flow
         test_complete_flow()
         
+        # Test 4: Multi-document processing
+        test_process_many()
+        
         print("=" * 60)
         print("✓ ALL TESTS PASSED!")
         print("=" * 60)
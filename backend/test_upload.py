@@ -2,17 +2,36 @@
 """
 Test script for document upload functionality.
 Tests: upload, file storage, and database record creation.
+
+Usage: python test_upload.py [--persist]
+
+With httpx installed, the app is served in-process and the test database
+is in memory. Without it, uploads go to a separately started server at
+localhost:8000, so the test database is ./test_database.db, which that
+server has to share. --persist always uses (and keeps) ./test_database.db,
+for inspecting it afterwards.
 """
 import sys
 import os
+import asyncio
+import contextlib
+import tempfile
+import uuid
 from pathlib import Path
 
-# Add backend to path
-sys.path.insert(0, str(Path(__file__).parent))
+try:
+    import httpx
+    HTTPX_AVAILABLE = True
+except ImportError:
+    HTTPX_AVAILABLE = False
 
-# Use SQLite for testing (no PostgreSQL required)
-os.environ["DATABASE_URL"] = "sqlite:///./test_database.db"
+# Use SQLite for testing (no PostgreSQL required). An in-memory database is
+# only visible to this process, so it is used only when the app runs in-process
+PERSIST_DB = "--persist" in sys.argv[1:]
+USE_MEMORY_DB = HTTPX_AVAILABLE and not PERSIST_DB
+os.environ["DATABASE_URL"] = "sqlite:///:memory:" if USE_MEMORY_DB else "sqlite:///./test_database.db"
 
+from conftest import use_fast_pragmas
 from app.db.database import engine, Base, SessionLocal
 from app.models import Document
 from app.storage.filesystem import FileStorage
@@ -20,39 +39,76 @@ from app.core.config import settings
 import requests
 import time
 
+BASE_URL = "http://localhost:8000"
+TEST_PDF_PATH = Path("../test_document.pdf")
+UPLOAD_FIELDS = {"description": "Test document", "tags": "test,upload"}
+UPLOAD_CHUNK_SIZE = 64 * 1024
+# PRAGMA schema_version of the test database right after the last create_all
+SCHEMA_VERSION_CACHE = Path("./test_database.db.schema_ver")
+
+def _schema_version() -> int:
+    """Read SQLite's schema cookie, which changes on every DDL statement."""
+    with engine.connect() as conn:
+        return conn.exec_driver_sql("PRAGMA schema_version").scalar()
+
 def setup_test_db():
     """Initialize test database."""
     print("Setting up test database...")
+    use_fast_pragmas(engine)
+    
+    if not PERSIST_DB:
+        Base.metadata.create_all(bind=engine)
+        print("✓ Test database initialized")
+        return
+    
+    # Skip create_all's reflection + DDL when nothing has touched the schema since
+    version = _schema_version()
+    if version and SCHEMA_VERSION_CACHE.exists() and SCHEMA_VERSION_CACHE.read_text() == str(version):
+        print("✓ Test database schema is current")
+        return
+    
     Base.metadata.create_all(bind=engine)
+    SCHEMA_VERSION_CACHE.write_text(str(_schema_version()))
     print("✓ Test database initialized")
 
 def cleanup_test_db():
-    """Clean up test database file."""
-    db_file = Path("test_database.db")
-    if db_file.exists():
-        db_file.unlink()
-        print("✓ Test database cleaned up")
+    """Clean up test database (a --persist database keeps its tables)."""
+    if not PERSIST_DB:
+        Base.metadata.drop_all(bind=engine)
+    engine.dispose()
+    print("✓ Test database cleaned up")
+
+@contextlib.contextmanager
+def shared_state():
+    """Open one database session and file storage for the subtests to share."""
+    db = SessionLocal()
+    try:
+        yield db, FileStorage()
+    finally:
+        db.close()
 
 def test_file_storage():
     """Test that file storage works."""
     print("\n1. Testing file storage...")
-    test_storage = FileStorage(base_path="./test_uploads")
-    test_content = b"test file content"
-    test_path = "test_file.pdf"
-    
-    # Save file
-    saved_path = test_storage.save(test_content, test_path)
-    assert Path(saved_path).exists(), "File should be saved"
-    print(f"   ✓ File saved to: {saved_path}")
-    
-    # Read file
-    read_content = test_storage.read(test_path)
-    assert read_content == test_content, "File content should match"
-    print("   ✓ File read successfully")
-    
-    # Cleanup
-    test_storage.delete(test_path)
-    print("   ✓ File deleted")
+    # A throwaway directory under the system temp dir (tmpfs on most Linux hosts)
+    with tempfile.TemporaryDirectory(prefix="test_uploads_") as upload_dir:
+        test_storage = FileStorage(base_path=upload_dir)
+        test_content = b"test file content"
+        test_path = "test_file.pdf"
+        
+        # Save file
+        saved = test_storage.save(test_content, test_path)
+        assert saved.st_size == len(test_content), "File should be saved"
+        print(f"   ✓ File saved to: {saved.path}")
+        
+        # Read file
+        read_content = test_storage.read(test_path)
+        assert read_content == test_content, "File content should match"
+        print("   ✓ File read successfully")
+        
+        # Cleanup
+        test_storage.delete(test_path)
+        print("   ✓ File deleted")
     
     return True
 
@@ -60,105 +116,149 @@ def test_upload_endpoint():
     """Test the upload endpoint."""
     print("\n2. Testing upload endpoint...")
     
-    # Wait for server to be ready
-    max_retries = 10
-    for i in range(max_retries):
-        try:
-            response = requests.get("http://localhost:8000/api/v1/health", timeout=2)
-            if response.status_code == 200:
-                print("   ✓ Server is running")
-                break
-        except requests.exceptions.RequestException:
-            if i < max_retries - 1:
-                time.sleep(1)
-                continue
-            else:
-                print("   ✗ Server is not running. Please start it with: uvicorn main:app --reload")
-                return False
-    
-    # Upload test PDF
-    test_pdf_path = Path("../test_document.pdf")
-    if not test_pdf_path.exists():
-        print(f"   ✗ Test PDF not found at {test_pdf_path}")
+    if not TEST_PDF_PATH.exists():
+        print(f"   ✗ Test PDF not found at {TEST_PDF_PATH}")
         return False
     
-    with open(test_pdf_path, "rb") as f:
-        files = {"file": ("test_document.pdf", f, "application/pdf")}
-        data = {"description": "Test document", "tags": "test,upload"}
+    # With httpx the app is served in-process: no socket and no readiness probe
+    if HTTPX_AVAILABLE:
+        print("   ✓ Using in-process app")
+        return asyncio.run(upload_test_document_in_process())
+    
+    # One keep-alive session for the readiness probe and the upload
+    with requests.Session() as session:
+        if not wait_for_server(session):
+            print("   ✗ Server is not running. Please start it with: uvicorn main:app --reload")
+            return False
+        print("   ✓ Server is running")
+        
+        return upload_test_document(session)
+
+def wait_for_server(session: requests.Session, max_wait: float = 10.0) -> bool:
+    """Poll the health endpoint with exponential backoff (0.1s doubling up to 1s)."""
+    deadline = time.monotonic() + max_wait
+    delay = 0.1
+    while True:
+        try:
+            if session.get(f"{BASE_URL}/api/v1/health", timeout=2).status_code == 200:
+                return True
+        except requests.exceptions.RequestException:
+            pass
+        if time.monotonic() + delay > deadline:
+            return False
+        time.sleep(delay)
+        delay = min(delay * 2, 1.0)
+
+def iter_multipart(fields: dict, file_field: str, filename: str, f, content_type: str, boundary: str):
+    """Yield a multipart/form-data body, reading the file in UPLOAD_CHUNK_SIZE chunks."""
+    for name, value in fields.items():
+        yield (
+            f"--{boundary}\r\n"
+            f'Content-Disposition: form-data; name="{name}"\r\n\r\n'
+            f"{value}\r\n"
+        ).encode()
+    yield (
+        f"--{boundary}\r\n"
+        f'Content-Disposition: form-data; name="{file_field}"; filename="{filename}"\r\n'
+        f"Content-Type: {content_type}\r\n\r\n"
+    ).encode()
+    while chunk := f.read(UPLOAD_CHUNK_SIZE):
+        yield chunk
+    yield f"\r\n--{boundary}--\r\n".encode()
+
+def report_upload(response):
+    """Print the outcome of an upload response; returns the new document ID."""
+    if response.status_code == 201:
+        result = response.json()
+        print(f"   ✓ Upload successful")
+        print(f"   ✓ Document ID: {result['document']['id']}")
+        print(f"   ✓ Filename: {result['document']['filename']}")
+        return result['document']['id']
+    else:
+        print(f"   ✗ Upload failed: {response.status_code}")
+        print(f"   Response: {response.text}")
+        return None
+
+def upload_test_document(session: requests.Session):
+    """Upload the sample PDF to the running server; returns the new document ID."""
+    with open(TEST_PDF_PATH, "rb") as f:
+        boundary = uuid.uuid4().hex
         
         try:
-            response = requests.post(
-                "http://localhost:8000/api/v1/documents/upload",
-                files=files,
-                data=data,
+            # Send the body as a chunked stream instead of building it in memory
+            response = session.post(
+                f"{BASE_URL}/api/v1/documents/upload",
+                data=iter_multipart(UPLOAD_FIELDS, "file", "test_document.pdf", f, "application/pdf", boundary),
+                headers={"Content-Type": f"multipart/form-data; boundary={boundary}"},
                 timeout=10
             )
-            
-            if response.status_code == 201:
-                result = response.json()
-                print(f"   ✓ Upload successful")
-                print(f"   ✓ Document ID: {result['document']['id']}")
-                print(f"   ✓ Filename: {result['document']['filename']}")
-                return result['document']['id']
-            else:
-                print(f"   ✗ Upload failed: {response.status_code}")
-                print(f"   Response: {response.text}")
-                return None
+            return report_upload(response)
         except requests.exceptions.RequestException as e:
             print(f"   ✗ Request failed: {e}")
             return None
 
-def test_file_saved(document_id: int):
-    """Test that file was saved to disk."""
-    print("\n3. Testing file saved to disk...")
+async def upload_test_document_in_process():
+    """Upload the sample PDF to the app over an ASGI transport; returns the new document ID."""
+    from main import app
     
-    db = SessionLocal()
-    try:
-        document = db.query(Document).filter(Document.id == document_id).first()
-        if not document:
-            print("   ✗ Document not found in database")
-            return False
+    with open(TEST_PDF_PATH, "rb") as f:
+        boundary = uuid.uuid4().hex
         
-        # Check if file exists in storage
-        storage = FileStorage()
-        full_path = Path(storage.base_path) / document.file_path
+        async def body():
+            for chunk in iter_multipart(UPLOAD_FIELDS, "file", "test_document.pdf", f, "application/pdf", boundary):
+                yield chunk
         
-        if full_path.exists():
-            file_size = full_path.stat().st_size
-            print(f"   ✓ File exists at: {full_path}")
-            print(f"   ✓ File size: {file_size} bytes")
-            print(f"   ✓ Matches DB record: {file_size == document.file_size}")
-            return True
-        else:
-            print(f"   ✗ File not found at: {full_path}")
-            return False
-    finally:
-        db.close()
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            response = await client.post(
+                "/api/v1/documents/upload",
+                content=body(),
+                headers={"Content-Type": f"multipart/form-data; boundary={boundary}"}
+            )
+        return report_upload(response)
 
-def test_db_record(document_id: int):
+def test_file_saved(document_id: int, db, storage: FileStorage):
+    """Test that file was saved to disk."""
+    print("\n3. Testing file saved to disk...")
+    
+    document = db.get(Document, document_id)
+    if not document:
+        print("   ✗ Document not found in database")
+        return False
+    
+    # Check if file exists in storage
+    full_path = Path(storage.base_path) / document.file_path
+    
+    if full_path.exists():
+        file_size = full_path.stat().st_size
+        print(f"   ✓ File exists at: {full_path}")
+        print(f"   ✓ File size: {file_size} bytes")
+        print(f"   ✓ Matches DB record: {file_size == document.file_size}")
+        return True
+    else:
+        print(f"   ✗ File not found at: {full_path}")
+        return False
+
+def test_db_record(document_id: int, db):
     """Test that database record was created."""
     print("\n4. Testing database record...")
     
-    db = SessionLocal()
-    try:
-        document = db.query(Document).filter(Document.id == document_id).first()
-        
-        if document:
-            print(f"   ✓ Document record found")
-            print(f"   ✓ ID: {document.id}")
-            print(f"   ✓ Filename: {document.filename}")
-            print(f"   ✓ File type: {document.file_type}")
-            print(f"   ✓ File size: {document.file_size} bytes")
-            print(f"   ✓ File path: {document.file_path}")
-            print(f"   ✓ Processed: {document.processed}")
-            print(f"   ✓ Description: {document.description}")
-            print(f"   ✓ Tags: {document.tags}")
-            return True
-        else:
-            print(f"   ✗ Document record not found")
-            return False
-    finally:
-        db.close()
+    document = db.get(Document, document_id)
+    
+    if document:
+        print(f"   ✓ Document record found")
+        print(f"   ✓ ID: {document.id}")
+        print(f"   ✓ Filename: {document.filename}")
+        print(f"   ✓ File type: {document.file_type}")
+        print(f"   ✓ File size: {document.file_size} bytes")
+        print(f"   ✓ File path: {document.file_path}")
+        print(f"   ✓ Processed: {document.processed}")
+        print(f"   ✓ Description: {document.description}")
+        print(f"   ✓ Tags: {document.tags}")
+        return True
+    else:
+        print(f"   ✗ Document record not found")
+        return False
 
 def main():
     """Run all tests."""
@@ -181,15 +281,16 @@ def main():
             print("\n✗ Upload endpoint test failed")
             return 1
         
-        # Test 3: File saved
-        if not test_file_saved(document_id):
-            print("\n✗ File saved test failed")
-            return 1
-        
-        # Test 4: DB record
-        if not test_db_record(document_id):
-            print("\n✗ Database record test failed")
-            return 1
+        with shared_state() as (db, storage):
+            # Test 3: File saved
+            if not test_file_saved(document_id, db, storage):
+                print("\n✗ File saved test failed")
+                return 1
+            
+            # Test 4: DB record
+            if not test_db_record(document_id, db):
+                print("\n✗ Database record test failed")
+                return 1
         
         print("\n" + "=" * 60)
         print("✓ All tests passed!")
@@ -3,24 +3,40 @@
 Simple test script for document upload functionality.
 Tests components directly without requiring server to be running.
 """
+import asyncio
+import atexit
+import io
+import itertools
 import sys
 import os
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
-# Add backend to path
-sys.path.insert(0, str(Path(__file__).parent))
-
 # Use SQLite for testing (no PostgreSQL required)
-os.environ["DATABASE_URL"] = "sqlite:///./test_database.db"
+os.environ["DATABASE_URL"] = "sqlite:///:memory:"
+
+from sqlalchemy import event, func, insert, select
 
+from conftest import use_fast_pragmas
 from app.db.database import engine, Base, SessionLocal
 from app.models import Document
 from app.storage.filesystem import FileStorage
-import uuid
+
+# Test file names: a random run ID (so reruns don't collide) plus a counter
+# (so names within a run are unique without an os.urandom call per name)
+_RUN_ID = os.urandom(4).hex()
+_name_counter = itertools.count()
+
+def _unique_id():
+    """Return a short ID for a test file name, unique within and across runs."""
+    return f"{_RUN_ID}_{next(_name_counter)}"
 
 def setup_test_db():
     """Initialize test database."""
     print("Setting up test database...")
+    use_fast_pragmas(engine)
     Base.metadata.create_all(bind=engine)
     print("✓ Test database initialized\n")
 
@@ -32,67 +48,86 @@ def test_file_storage():
     
     test_storage = FileStorage(base_path="./test_uploads")
     test_content = b"%PDF-1.4\nTest PDF Content"
-    test_path = f"test_{uuid.uuid4().hex[:8]}.pdf"
+    test_path = f"test_{_unique_id()}.pdf"
+    stream_path = f"test_{_unique_id()}.pdf"
     
-    # Save file
-    saved_path = test_storage.save(test_content, test_path)
-    assert Path(saved_path).exists(), "File should be saved"
-    print(f"✓ File saved to: {saved_path}")
+    # Save from bytes and from a file-like object (streamed copy) concurrently
+    async def save_both():
+        return await asyncio.gather(
+            test_storage.save_async(test_content, test_path),
+            test_storage.save_async(io.BytesIO(test_content), stream_path)
+        )
+    
+    saved, streamed = asyncio.run(save_both())
+    assert saved.st_size == len(test_content), "File should be saved"
+    assert streamed.st_size == len(test_content), "Streamed file should be saved"
+    print(f"✓ File saved to: {saved.path}")
     
     # Verify file content
     read_content = test_storage.read(test_path)
     assert read_content == test_content, "File content should match"
     print(f"✓ File content verified ({len(read_content)} bytes)")
     
+    with test_storage.read_stream(stream_path) as f:
+        assert f.read() == test_content, "Streamed file content should match"
+    print("✓ Streamed save verified")
+    
     # Cleanup
     test_storage.delete(test_path)
+    test_storage.delete(stream_path)
     print("✓ Test file cleaned up\n")
-    
-    return True
 
-def test_db_record():
+# Minimal PDF written when ../test_document.pdf is missing
+_MINIMAL_PDF = b"%PDF-1.4\n1 0 obj\n<<\n/Type /Catalog\n>>\nendobj\nxref\n0 1\ntrailer\n<<\n/Size 1\n>>\nstartxref\n9\n%%EOF"
+
+# Column values shared by every test document record
+_DOC_DEFAULTS = dict(
+    filename="test_document.pdf",
+    file_type="pdf",
+    file_size=1024,
+    mime_type="application/pdf",
+    description="Test document",
+    tags="test,upload",
+    processed="completed"
+)
+
+def _make_doc_dicts(n, prefix="test_path"):
+    """Build column values for n test document records."""
+    # Local name and a dict display keep the 10k-row loop free of global lookups
+    defaults = _DOC_DEFAULTS
+    return [{**defaults, "file_path": f"{prefix}_{i}.pdf"} for i in range(n)]
+
+def test_db_record(db):
     """Test that database record can be created."""
     print("=" * 60)
     print("TEST 2: Database Record Creation")
     print("=" * 60)
     
-    db = SessionLocal()
-    try:
-        # Create a test document record
-        test_document = Document(
-            filename="test_document.pdf",
-            file_path="test_path.pdf",
-            file_type="pdf",
-            file_size=1024,
-            mime_type="application/pdf",
-            description="Test document",
-            tags="test,upload",
-            processed="completed"
-        )
-        
-        db.add(test_document)
-        db.commit()
-        db.refresh(test_document)
-        
-        print(f"✓ Document record created")
-        print(f"  ID: {test_document.id}")
-        print(f"  Filename: {test_document.filename}")
-        print(f"  File type: {test_document.file_type}")
-        print(f"  File size: {test_document.file_size} bytes")
-        print(f"  Processed: {test_document.processed}")
-        
-        # Verify we can query it back
-        retrieved = db.query(Document).filter(Document.id == test_document.id).first()
-        assert retrieved is not None, "Document should be retrievable"
-        assert retrieved.filename == "test_document.pdf", "Filename should match"
-        print(f"✓ Document record verified in database\n")
-        
-        return test_document.id
-    finally:
-        db.close()
+    # Create test document records with one executemany INSERT
+    test_documents = _make_doc_dicts(3)
+    db.execute(insert(Document), test_documents)
+    
+    test_document = test_documents[0]
+    print(f"✓ {len(test_documents)} document records created")
+    print(f"  Filename: {test_document['filename']}")
+    print(f"  File type: {test_document['file_type']}")
+    print(f"  File size: {test_document['file_size']} bytes")
+    print(f"  Processed: {test_document['processed']}")
+    
+    # Verify we can query them back
+    paths = [doc["file_path"] for doc in test_documents]
+    retrieved = db.query(Document).filter(Document.file_path.in_(paths)).order_by(Document.id).all()
+    assert [doc.file_path for doc in retrieved] == paths, "Documents should be retrievable in insert order"
+    assert all(doc.filename == "test_document.pdf" for doc in retrieved), "Filename should match"
+    print(f"  IDs: {[doc.id for doc in retrieved]}")
+    print(f"✓ Document records verified in database\n")
 
-def test_full_upload_flow():
+def test_full_upload_flow(db):
     """Test the full upload flow: file storage + DB record."""
+    run_full_upload_flow(db)
+
+def run_full_upload_flow(db):
+    """Store the test PDF and create its DB record, verifying both; returns the document ID."""
     print("=" * 60)
     print("TEST 3: Full Upload Flow")
     print("=" * 60)
@@ -102,60 +137,133 @@ def test_full_upload_flow():
     if not test_pdf_path.exists():
         print(f"✗ Test PDF not found at {test_pdf_path}")
         print("  Creating minimal test PDF...")
-        # Create minimal PDF
-        pdf_content = b"%PDF-1.4\n1 0 obj\n<<\n/Type /Catalog\n>>\nendobj\nxref\n0 1\ntrailer\n<<\n/Size 1\n>>\nstartxref\n9\n%%EOF"
         test_pdf_path = Path("./test_document.pdf")
-        test_pdf_path.write_bytes(pdf_content)
+        test_pdf_path.write_bytes(_MINIMAL_PDF)
     
-    file_content = test_pdf_path.read_bytes()
-    file_size = len(file_content)
+    file_size = test_pdf_path.stat().st_size
     
-    print(f"✓ Test PDF loaded ({file_size} bytes)")
+    print(f"✓ Test PDF ready ({file_size} bytes)")
     
-    # Store file
     storage = FileStorage()
-    storage_path = f"documents/{uuid.uuid4().hex[:8]}.pdf"
-    saved_path = storage.save(file_content, storage_path)
-    print(f"✓ File saved to: {saved_path}")
+    storage_path = f"documents/{_unique_id()}.pdf"
     
-    # Create DB record
-    db = SessionLocal()
+    # Store the file (copied kernel-side, never read into Python) in a worker
+    # thread while this thread creates the DB record; the session stays here
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        save_future = executor.submit(storage.save_path, test_pdf_path, storage_path)
+        document_id = db.execute(
+            insert(Document).values(
+                filename=test_pdf_path.name,
+                file_path=storage_path,
+                file_type="pdf",
+                file_size=file_size,
+                mime_type="application/pdf",
+                description="Test upload",
+                tags="test",
+                processed="completed"
+            ).returning(Document.id)
+        ).scalar_one()
+        saved = save_future.result()
+    
+    assert Path(saved.path).read_bytes() == test_pdf_path.read_bytes(), "Saved copy should match source"
+    print(f"✓ File saved to: {saved.path}")
+    print(f"✓ Database record created (ID: {document_id})")
+    
+    # Verify file still exists
+    assert saved.st_size == file_size, "Saved file size should match"
+    print(f"✓ File verified on disk")
+    
+    # Verify DB record
+    retrieved = db.query(Document).filter(Document.id == document_id).first()
+    assert retrieved is not None, "Document should be in database"
+    assert retrieved.file_size == file_size, "File size should match"
+    print(f"✓ Database record verified")
+    
+    print(f"\n✓ Full upload flow successful!")
+    print(f"  Document ID: {document_id}")
+    print(f"  File path: {saved.path}")
+    print(f"  File size: {file_size} bytes\n")
+    
+    return document_id
+
+def test_streaming_upload():
+    """Test saving a large file from a chunk stream without buffering it."""
+    print("=" * 60)
+    print("TEST 4: Streaming Upload")
+    print("=" * 60)
+    
+    chunk_size = 1024 * 1024
+    chunk_count = 32
+    test_storage = FileStorage(base_path="./test_uploads")
+    source_path = Path(test_storage.base_path) / f"source_{_unique_id()}.pdf"
+    with open(source_path, "wb") as f:
+        for _ in range(chunk_count):
+            f.write(b"\0" * chunk_size)
+    print(f"✓ Source file written ({chunk_count} MiB)")
+    
+    def read_chunks(f):
+        while chunk := f.read(chunk_size):
+            yield chunk
+    
+    # Peak Python allocation during the save alone; holding the file would be
+    # chunk_count chunks, streaming needs the current chunk and the next one
+    stream_path = f"test_{_unique_id()}.pdf"
+    tracemalloc.start()
     try:
-        document = Document(
-            filename=test_pdf_path.name,
-            file_path=storage_path,
-            file_type="pdf",
-            file_size=file_size,
-            mime_type="application/pdf",
-            description="Test upload",
-            tags="test",
-            processed="completed"
-        )
-        
-        db.add(document)
-        db.commit()
-        db.refresh(document)
-        
-        print(f"✓ Database record created (ID: {document.id})")
-        
-        # Verify file still exists
-        assert Path(saved_path).exists(), "File should still exist"
-        print(f"✓ File verified on disk")
-        
-        # Verify DB record
-        retrieved = db.query(Document).filter(Document.id == document.id).first()
-        assert retrieved is not None, "Document should be in database"
-        assert retrieved.file_size == file_size, "File size should match"
-        print(f"✓ Database record verified")
-        
-        print(f"\n✓ Full upload flow successful!")
-        print(f"  Document ID: {document.id}")
-        print(f"  File path: {saved_path}")
-        print(f"  File size: {file_size} bytes\n")
-        
-        return document.id
+        with open(source_path, "rb") as f:
+            saved = test_storage.save_stream(read_chunks(f), stream_path)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    
+    assert saved.st_size == chunk_count * chunk_size, "Streamed file size should match"
+    print(f"✓ File streamed to: {saved.path}")
+    assert peak < 3 * chunk_size, f"Peak allocation was {peak / chunk_size:.1f} chunks while streaming"
+    print(f"✓ Peak allocation: {peak / 1024 / 1024:.1f} MiB")
+    
+    # Cleanup
+    test_storage.delete(stream_path)
+    source_path.unlink()
+    print("✓ Test files cleaned up\n")
+
+def test_batch_upload(db, n=10_000):
+    """Test that a batch of documents is inserted with one executemany and one COMMIT."""
+    print("=" * 60)
+    print("TEST 5: Batch Upload")
+    print("=" * 60)
+    
+    documents = _make_doc_dicts(n, prefix="batch_path")
+    insert_calls = []
+    commits = []
+    
+    def count_insert(conn, cursor, statement, parameters, context, executemany):
+        if statement.startswith("INSERT INTO documents"):
+            insert_calls.append(executemany)
+    
+    def count_commit(conn):
+        commits.append(conn)
+    
+    event.listen(engine, "before_cursor_execute", count_insert)
+    event.listen(engine, "commit", count_commit)
+    try:
+        start = time.perf_counter()
+        with db.begin():
+            db.bulk_insert_mappings(Document, documents)
+        elapsed = time.perf_counter() - start
     finally:
-        db.close()
+        event.remove(engine, "before_cursor_execute", count_insert)
+        event.remove(engine, "commit", count_commit)
+    
+    assert insert_calls == [True], f"Expected one executemany INSERT, got {len(insert_calls)} statements"
+    assert len(commits) == 1, f"Expected one COMMIT, got {len(commits)}"
+    print(f"✓ {n} documents inserted with one executemany and one COMMIT")
+    
+    count = db.scalar(select(func.count()).select_from(Document).where(Document.file_path.like("batch_path_%")))
+    assert count == n, f"Expected {n} batch documents, found {count}"
+    print(f"✓ Document count verified ({count})")
+    
+    # Reported, not asserted: wall-clock time depends on the machine's load
+    print(f"✓ Batch inserted in {elapsed:.3f}s\n")
 
 def main():
     """Run all tests."""
@@ -166,15 +274,27 @@ def main():
     # Setup
     setup_test_db()
     
+    # One session (and pooled connection) for every database test
+    db = SessionLocal()
+    atexit.register(db.close)
+    
     try:
         # Test 1: File storage
         test_file_storage()
         
-        # Test 2: DB record creation
-        doc_id = test_db_record()
+        # Tests 2 and 3 share one transaction on the session
+        with db.begin():
+            # Test 2: DB record creation
+            test_db_record(db)
+            
+            # Test 3: Full flow
+            full_doc_id = run_full_upload_flow(db)
+        
+        # Test 4: Streaming upload
+        test_streaming_upload()
         
-        # Test 3: Full flow
-        full_doc_id = test_full_upload_flow()
+        # Test 5: Batch upload
+        test_batch_upload(db)
         
         print("=" * 60)
         print("✓ ALL TESTS PASSED!")
@@ -183,6 +303,8 @@ def main():
         print("  ✓ File storage works")
         print("  ✓ Database records can be created")
         print("  ✓ Full upload flow (file + DB) works")
+        print("  ✓ Large files stream to storage in chunks")
+        print("  ✓ Batches insert with one executemany and one commit")
         print(f"\nTest document ID: {full_doc_id}")
         return 0
         